@@ -1,9 +1,12 @@
 from typing import Dict, List, Any, Optional
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from database.schema_inspector import SchemaInspector
 from database.query_executor import QueryExecutor
 from visualization.chart_generator import ChartGenerator
 from agents.query_agent import QueryAgent
+from config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -14,25 +17,32 @@ class QueryOrchestrator:
         self.chart_generator = ChartGenerator()
         self.current_connection = None
         self.current_executor = None
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="orchestrator-io")
     
-    def connect_database(self, connection_string: str = None) -> Dict[str, Any]:
+    async def _run_blocking(self, func, *args):
+        """Run a blocking database call on the I/O thread pool so the event loop stays free"""
+        return await asyncio.get_running_loop().run_in_executor(self._io_pool, func, *args)
+    
+    async def connect_database(self, connection_string: str = None) -> Dict[str, Any]:
         """Connect to database and extract schema"""
         try:
             # If no connection string provided, use test database
             if not connection_string:
                 # Use absolute path to test database
-                import os
-                project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                db_path = os.path.join(project_root, "test_database.db")
-                connection_string = f"sqlite:///{db_path}"
-                logger.info("No connection string provided, using test database")
+                connection_string = Config.DEFAULT_SQLITE_CONNECTION_STRING
+                logger.debug("No connection string provided, using test database")
             
-            # Validate connection and extract schema
-            schema_info = self.schema_inspector.get_schema(connection_string)
+            # Validate connection and extract schema (fresh on every connect)
+            self.schema_inspector.invalidate_schema(connection_string)
+            schema_info = await self._run_blocking(self.schema_inspector.get_schema, connection_string)
             
             # Store connection for query execution
+            if self.current_executor is None or self.current_connection != connection_string:
+                self.current_executor = QueryExecutor(connection_string)
+            else:
+                # A reconnect asks for fresh data, not results cached before it
+                self.current_executor.clear_result_cache()
             self.current_connection = connection_string
-            self.current_executor = QueryExecutor(connection_string)
             
             return {
                 "success": True,
@@ -42,13 +52,13 @@ class QueryOrchestrator:
             }
             
         except Exception as e:
-            logger.error(f"Database connection failed: {e}")
+            logger.error("Database connection failed: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to connect to database: {str(e)}"
             }
     
-    def process_natural_language_query(self, user_query: str) -> Dict[str, Any]:
+    async def process_natural_language_query(self, user_query: str) -> Dict[str, Any]:
         """Main orchestration method for processing natural language queries"""
         if not self.current_connection or not self.current_executor:
             return {
@@ -58,10 +68,10 @@ class QueryOrchestrator:
         
         try:
             # Step 1: Get current schema
-            schema_info = self.schema_inspector.get_schema(self.current_connection)
+            schema_info = await self._run_blocking(self.schema_inspector.get_schema, self.current_connection)
             
             # Step 2: Process query with AI agent
-            agent_response = self.query_agent.process_query(user_query, schema_info)
+            agent_response = await self.query_agent.process_query(user_query, schema_info)
             
             if not agent_response.get("success"):
                 return agent_response
@@ -78,8 +88,23 @@ class QueryOrchestrator:
                         "error": "No SQL query generated"
                     }
                 
-                # Step 4: Execute SQL query
-                query_results = self.current_executor.execute_query(sql_query)
+                # Skip malformed items rather than failing the whole request on them
+                additional_queries = [
+                    q for q in sql_info.get("additional_queries") or []
+                    if isinstance(q, dict) and q.get("query")
+                ]
+                
+                # Step 4: Execute the (blocking) SQL queries concurrently on the I/O thread pool
+                all_results = await asyncio.gather(*(
+                    self._run_blocking(self.current_executor.execute_query, query)
+                    for query in [sql_query] + [q["query"] for q in additional_queries]
+                ))
+                query_results = all_results[0]
+                
+                # Asking again is how a user gets a different generation, so SQL
+                # that failed to run must not be served from the cache
+                if not all(result.get("success") for result in all_results):
+                    self.query_agent.invalidate_sql(user_query, schema_info)
                 
                 if not query_results.get("success"):
                     return {
@@ -89,24 +114,25 @@ class QueryOrchestrator:
                         "sql_explanation": sql_explanation
                     }
                 
-                # Step 5: Get visualization suggestion
-                viz_suggestion = self.query_agent.suggest_visualization_for_results(
+                # Step 5: Get visualization suggestion (rule-based unless the result shape is ambiguous)
+                viz_suggestion = await self.query_agent.suggest_visualization_for_results(
                     query_results, user_query
                 )
                 
                 # Step 6: Generate chart
+                results = self._format_query_results(query_results)
+                viz_info = viz_suggestion.get("visualization") if viz_suggestion.get("success") else None
                 chart_type = None
                 chart_title = f"Results for: {user_query}"
                 
-                if viz_suggestion.get("success"):
-                    viz_info = viz_suggestion.get("visualization", {})
+                if viz_info:
                     chart_type = viz_info.get("chart_type")
                     chart_title = viz_info.get("title", chart_title)
                 
                 chart_result = self.chart_generator.generate_chart(
-                    data=query_results.get("data", []),
-                    columns=query_results.get("columns", []),
-                    data_types=query_results.get("data_types", {}),
+                    data=results["data"],
+                    columns=results["columns"],
+                    data_types=results["data_types"],
                     chart_type=chart_type,
                     title=chart_title
                 )
@@ -117,19 +143,21 @@ class QueryOrchestrator:
                     "user_query": user_query,
                     "sql_query": sql_query,
                     "sql_explanation": sql_explanation,
-                    "query_results": {
-                        "data": query_results.get("data", []),
-                        "columns": query_results.get("columns", []),
-                        "row_count": query_results.get("row_count", 0),
-                        "data_types": query_results.get("data_types", {})
-                    },
+                    "query_results": results,
                     "visualization": chart_result,
-                    "tables_used": sql_info.get("tables_used", [])
+                    "tables_used": self.current_executor.get_tables_used(sql_query)
                 }
                 
+                # Add results of independent sub-queries, each with its own chart
+                if additional_queries:
+                    response["additional_results"] = [
+                        self._build_additional_result(sub_query, sub_results)
+                        for sub_query, sub_results in zip(additional_queries, all_results[1:])
+                    ]
+                
                 # Add visualization suggestion if available
-                if viz_suggestion.get("success"):
-                    response["visualization_suggestion"] = viz_suggestion.get("visualization")
+                if viz_info:
+                    response["visualization_suggestion"] = viz_info
                 
                 return response
             
@@ -142,14 +170,45 @@ class QueryOrchestrator:
                 }
                 
         except Exception as e:
-            logger.error(f"Query orchestration failed: {e}")
+            logger.error("Query orchestration failed: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to process query: {str(e)}"
             }
     
-    def get_schema_info(self) -> Dict[str, Any]:
-        """Get current database schema information"""
+    @staticmethod
+    def _format_query_results(query_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick the fields of an execution result that are returned to the client"""
+        return {
+            "data": query_results.get("data") or [],
+            "columns": query_results.get("columns") or [],
+            "row_count": query_results.get("row_count", 0),
+            "data_types": query_results.get("data_types") or {}
+        }
+    
+    def _build_additional_result(self, sub_query: Dict[str, Any], query_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the response entry for one independent sub-query"""
+        entry = {
+            "sql_query": sub_query["query"],
+            "sql_explanation": sub_query.get("explanation", "")
+        }
+        
+        if not query_results.get("success"):
+            entry["error"] = f"Query execution failed: {query_results.get('error')}"
+            return entry
+        
+        results = self._format_query_results(query_results)
+        entry["query_results"] = results
+        entry["visualization"] = self.chart_generator.generate_chart(
+            data=results["data"],
+            columns=results["columns"],
+            data_types=results["data_types"],
+            title=entry["sql_explanation"] or "Additional results"
+        )
+        return entry
+    
+    async def get_schema_info_json(self) -> Dict[str, Any]:
+        """Get the /api/schema response body as pre-serialized JSON bytes"""
         if not self.current_connection:
             return {
                 "success": False,
@@ -157,13 +216,13 @@ class QueryOrchestrator:
             }
         
         try:
-            schema_info = self.schema_inspector.get_schema(self.current_connection)
+            schema_json = await self._run_blocking(self.schema_inspector.get_schema_json, self.current_connection)
             return {
                 "success": True,
-                "schema": schema_info
+                "content": b'{"success":true,"schema":' + schema_json + b'}'
             }
         except Exception as e:
-            logger.error(f"Failed to get schema: {e}")
+            logger.error("Failed to get schema: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get schema: {str(e)}"
@@ -171,6 +230,10 @@ class QueryOrchestrator:
     
     def disconnect_database(self) -> Dict[str, Any]:
         """Disconnect from current database"""
+        self.schema_inspector.invalidate_schema()
+        if self.current_executor:
+            self.current_executor.clear_result_cache()
+        self.schema_inspector.disconnect()
         self.current_connection = None
         self.current_executor = None
         
@@ -179,7 +242,7 @@ class QueryOrchestrator:
             "message": "Database disconnected successfully"
         }
     
-    def get_sample_data(self, table_name: str, limit: int = 5) -> Dict[str, Any]:
+    async def get_sample_data(self, table_name: str, limit: int = 5, page_token: Optional[str] = None) -> Dict[str, Any]:
         """Get sample data from a specific table"""
         if not self.current_connection:
             return {
@@ -189,23 +252,27 @@ class QueryOrchestrator:
         
         try:
             # Validate table exists
-            if not self.schema_inspector.validate_table_exists(table_name):
+            if not await self._run_blocking(self.schema_inspector.validate_table_exists, table_name):
                 return {
                     "success": False,
                     "error": f"Table '{table_name}' does not exist"
                 }
             
-            sample_data = self.schema_inspector.get_table_sample_data(table_name, limit)
+            columns, rows, next_page_token = await self._run_blocking(
+                self.schema_inspector.get_table_sample_data, table_name, limit, page_token
+            )
             
             return {
                 "success": True,
                 "table_name": table_name,
-                "sample_data": sample_data,
-                "row_count": len(sample_data)
+                "columns": columns,
+                "rows": rows,
+                "row_count": len(rows),
+                "next_page_token": next_page_token
             }
             
         except Exception as e:
-            logger.error(f"Failed to get sample data: {e}")
+            logger.error("Failed to get sample data: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to get sample data: {str(e)}"
@@ -1,78 +1,68 @@
 import openai
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+from collections import OrderedDict
+import hashlib
 import json
 import logging
+import re
+import threading
+import time
 from config import Config
+from visualization.chart_generator import ChartGenerator
 
 logger = logging.getLogger(__name__)
 
+# Result sizes for the rule-based chart choice: up to _MAX_BAR_CATEGORIES categories
+# read best as bars, up to _MAX_CHART_ROWS as a pie; larger results go in a table
+_MAX_BAR_CATEGORIES = 10
+_MAX_CHART_ROWS = 50
+
 class QueryAgent:
     def __init__(self):
         if not Config.OPENAI_API_KEY:
             raise ValueError("OpenAI API key not found in environment variables")
         
-        self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
-        self.functions = self._define_functions()
+        self.client = openai.AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+        self.functions = {function["name"]: function for function in self._define_functions()}
+        # Keyed on free-form user text, so each cache is a bounded LRU of (stored_at, value)
+        self._sql_cache: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._viz_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._prompt_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _get_cached(self, cache: OrderedDict, key: Any, ttl: Optional[float] = None) -> Any:
+        """Return a cached value, or None when missing or older than ttl"""
+        with self._cache_lock:
+            cached = cache.get(key)
+            if cached is None:
+                return None
+            if ttl is not None and time.monotonic() - cached[0] >= ttl:
+                del cache[key]
+                return None
+            cache.move_to_end(key)
+            return cached[1]
+    
+    def _store_cached(self, cache: OrderedDict, key: Any, value: Any) -> None:
+        """Cache a value, evicting the least recently used entries when full"""
+        with self._cache_lock:
+            cache[key] = (time.monotonic(), value)
+            cache.move_to_end(key)
+            while len(cache) > Config.LLM_CACHE_SIZE:
+                cache.popitem(last=False)
+    
+    @staticmethod
+    def _canonicalize(user_query: str) -> str:
+        """Normalize a natural language query so trivially different phrasings share a cache key"""
+        return re.sub(r"\s+", " ", user_query.lower()).strip().rstrip("?.!").strip()
+    
+    @staticmethod
+    def _schema_key(schema_info: Dict[str, Any]) -> str:
+        """Stable hash of the schema used to scope cached LLM responses"""
+        return hashlib.sha1(json.dumps(schema_info, sort_keys=True, default=str).encode()).hexdigest()
     
     def _define_functions(self) -> List[Dict[str, Any]]:
         """Define function schemas for OpenAI function calling"""
         return [
-            {
-                "name": "analyze_query",
-                "description": "Analyze a natural language query to understand user intent and extract key information",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "intent": {
-                            "type": "string",
-                            "description": "The main intent of the query (e.g., 'compare', 'summarize', 'filter', 'aggregate')"
-                        },
-                        "entities": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "Key entities mentioned in the query (table names, column names, values)"
-                        },
-                        "filters": {
-                            "type": "array",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "column": {"type": "string"},
-                                    "operator": {"type": "string"},
-                                    "value": {"type": "string"}
-                                }
-                            },
-                            "description": "Filter conditions extracted from the query"
-                        },
-                        "aggregations": {
-                            "type": "array",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "function": {"type": "string"},
-                                    "column": {"type": "string"}
-                                }
-                            },
-                            "description": "Aggregation functions needed (SUM, COUNT, AVG, etc.)"
-                        },
-                        "group_by": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "Columns to group by"
-                        },
-                        "time_range": {
-                            "type": "object",
-                            "properties": {
-                                "start": {"type": "string"},
-                                "end": {"type": "string"},
-                                "column": {"type": "string"}
-                            },
-                            "description": "Time range filters if mentioned"
-                        }
-                    },
-                    "required": ["intent", "entities"]
-                }
-            },
             {
                 "name": "generate_sql",
                 "description": "Generate SQL query based on analyzed query intent and database schema",
@@ -91,6 +81,18 @@ class QueryAgent:
                             "type": "array",
                             "items": {"type": "string"},
                             "description": "List of tables used in the query"
+                        },
+                        "additional_queries": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "query": {"type": "string"},
+                                    "explanation": {"type": "string"}
+                                },
+                                "required": ["query", "explanation"]
+                            },
+                            "description": "Further independent SELECT queries when the question breaks down into separate parts; omit otherwise"
                         }
                     },
                     "required": ["query", "explanation", "tables_used"]
@@ -121,37 +123,39 @@ class QueryAgent:
             }
         ]
     
-    def process_query(self, user_query: str, schema_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_query(self, user_query: str, schema_info: Dict[str, Any]) -> Dict[str, Any]:
         """Process a natural language query using OpenAI function calling"""
+        schema_key = self._schema_key(schema_info)
+        cache_key = (self._canonicalize(user_query), schema_key)
+        cached = self._get_cached(self._sql_cache, cache_key, Config.LLM_CACHE_TTL)
+        if cached is not None:
+            return cached
+        
         try:
             # Create system prompt with schema context
-            system_prompt = self._create_system_prompt(schema_info)
+            system_prompt = self._create_system_prompt(schema_info, schema_key)
             
-            # Call OpenAI with function calling
-            response = self.client.chat.completions.create(
+            # Call OpenAI forcing SQL generation directly - a separate intent
+            # analysis round-trip was never consumed downstream
+            response = await self.client.chat.completions.create(
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_query}
                 ],
-                functions=self.functions,
-                function_call="auto",
+                functions=[self.functions["generate_sql"]],
+                function_call={"name": "generate_sql"},
                 temperature=0.1
             )
             
             message = response.choices[0].message
             
             # Handle function calls
-            if message.function_call:
-                function_name = message.function_call.name
+            if message.function_call and message.function_call.name == "generate_sql":
                 function_args = json.loads(message.function_call.arguments)
-                
-                if function_name == "analyze_query":
-                    return self._handle_analyze_query(function_args, user_query, schema_info)
-                elif function_name == "generate_sql":
-                    return self._handle_generate_sql(function_args)
-                elif function_name == "suggest_visualization":
-                    return self._handle_suggest_visualization(function_args)
+                result = self._handle_generate_sql(function_args)
+                self._store_cached(self._sql_cache, cache_key, result)
+                return result
             
             # If no function call, return the text response
             return {
@@ -161,90 +165,62 @@ class QueryAgent:
             }
             
         except Exception as e:
-            logger.error(f"Query processing failed: {e}")
+            logger.error("Query processing failed: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to process query: {str(e)}"
             }
     
-    def _create_system_prompt(self, schema_info: Dict[str, Any]) -> str:
-        """Create system prompt with database schema context"""
-        schema_desc = schema_info.get("natural_language_description", "")
-        tables_info = schema_info.get("tables", {})
-        
-        prompt = f"""You are a SQL query assistant for a PostgreSQL database. Your job is to help users query their data using natural language.
-
-Database Schema:
-{schema_desc}
-
-Available Tables and Columns:
-"""
+    def invalidate_sql(self, user_query: str, schema_info: Dict[str, Any]) -> None:
+        """Forget the generated SQL for a query, e.g. after it failed to execute"""
+        with self._cache_lock:
+            self._sql_cache.pop((self._canonicalize(user_query), self._schema_key(schema_info)), None)
+    
+    def _create_system_prompt(self, schema_info: Dict[str, Any], schema_key: Optional[str] = None) -> str:
+        """Create system prompt with database schema context, memoized per schema"""
+        if schema_key is None:
+            schema_key = self._schema_key(schema_info)
+        cached = self._get_cached(self._prompt_cache, schema_key)
+        if cached is not None:
+            return cached
         
-        for table_name, table_info in tables_info.items():
-            columns = list(table_info["columns"].keys())
-            prompt += f"\nTable '{table_name}': {', '.join(columns)}"
-            
-            # Add foreign key information
+        # Compact, minified JSON: one entry per table with its columns and foreign keys.
+        # The prose natural_language_description repeats the same facts in far more tokens.
+        schema_blob = {}
+        for table_name, table_info in schema_info.get("tables", {}).items():
+            table_entry = {"cols": list(table_info["columns"])}
             if table_info.get("foreign_keys"):
-                fk_info = []
-                for fk in table_info["foreign_keys"]:
-                    fk_info.append(f"{fk['column']} -> {fk['referenced_table']}.{fk['referenced_column']}")
-                prompt += f" (Foreign keys: {'; '.join(fk_info)})"
+                table_entry["fk"] = [
+                    f"{fk['column']}->{fk['referenced_table']}.{fk['referenced_column']}"
+                    for fk in table_info["foreign_keys"]
+                ]
+            schema_blob[table_name] = table_entry
+        schema_json = json.dumps(schema_blob, separators=(",", ":"))
         
-        prompt += """
+        prompt_parts = [f"""You are a SQL query assistant for a PostgreSQL database. Your job is to help users query their data using natural language.
+
+Database Schema (JSON: table -> cols, fk as column->table.column):
+{schema_json}"""]
+        
+        prompt_parts.append("""
 
 Instructions:
-1. When a user asks a question, first analyze their intent using the analyze_query function
-2. Then generate appropriate SQL using the generate_sql function
-3. Always use proper JOIN syntax when connecting related tables
-4. Use appropriate aggregation functions (SUM, COUNT, AVG, etc.) when needed
-5. Include proper WHERE clauses for filtering
-6. Use GROUP BY when aggregating data
-7. Only generate SELECT queries - never DROP, DELETE, UPDATE, or INSERT
-8. Be specific with column and table names from the schema
-9. If the query involves time-based data, use proper date filtering
+1. When a user asks a question, work out their intent and generate appropriate SQL using the generate_sql function
+2. Always use proper JOIN syntax when connecting related tables
+3. Use appropriate aggregation functions (SUM, COUNT, AVG, etc.) when needed
+4. Include proper WHERE clauses for filtering
+5. Use GROUP BY when aggregating data
+6. Only generate SELECT queries - never DROP, DELETE, UPDATE, or INSERT
+7. Be specific with column and table names from the schema
+8. If the query involves time-based data, use proper date filtering
+9. If the question asks for several unrelated results, put the first in query and the rest in additional_queries instead of forcing them into one statement
 
-Remember: You can only query the tables and columns that exist in the schema above."""
+Remember: You can only query the tables and columns that exist in the schema above.""")
         
+        prompt = "".join(prompt_parts)
+        self._store_cached(self._prompt_cache, schema_key, prompt)
         return prompt
     
-    def _handle_analyze_query(self, args: Dict[str, Any], user_query: str, schema_info: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle query analysis and proceed to SQL generation"""
-        try:
-            # Now generate SQL based on the analysis
-            sql_response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": self._create_system_prompt(schema_info)},
-                    {"role": "user", "content": user_query}
-                ],
-                functions=[self.functions[1]],  # generate_sql function
-                function_call={"name": "generate_sql"},
-                temperature=0.1
-            )
-            
-            sql_message = sql_response.choices[0].message
-            if sql_message.function_call and sql_message.function_call.name == "generate_sql":
-                sql_args = json.loads(sql_message.function_call.arguments)
-                return {
-                    "success": True,
-                    "analysis": args,
-                    "sql": sql_args,
-                    "type": "sql_generation"
-                }
-            
-            return {
-                "success": False,
-                "error": "Failed to generate SQL after analysis"
-            }
-            
-        except Exception as e:
-            logger.error(f"SQL generation failed: {e}")
-            return {
-                "success": False,
-                "error": f"SQL generation failed: {str(e)}"
-            }
-    
     def _handle_generate_sql(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Handle SQL generation response"""
         return {
@@ -253,15 +229,29 @@ Remember: You can only query the tables and columns that exist in the schema abo
             "type": "sql_generation"
         }
     
-    def _handle_suggest_visualization(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle visualization suggestion response"""
-        return {
-            "success": True,
-            "visualization": args,
-            "type": "visualization_suggestion"
-        }
+    @staticmethod
+    def _suggest_viz_local(columns: List[str], data_types: Dict[str, str], row_count: int) -> Optional[Dict[str, str]]:
+        """Pick a chart type from the result shape alone; None when the shape is ambiguous"""
+        # Same column classification the chart generator draws with
+        numeric_cols, categorical_cols, datetime_cols = ChartGenerator.classify_columns(columns, data_types)
+        
+        if row_count == 0:
+            return {"chart_type": "table", "reason": "No rows returned"}
+        if len(columns) == 2:
+            if len(datetime_cols) == 1 and len(numeric_cols) == 1:
+                return {"chart_type": "line", "reason": "Numeric values over time"}
+            if len(numeric_cols) == 2:
+                return {"chart_type": "scatter", "reason": "Two numeric columns for correlation analysis"}
+            if len(categorical_cols) == 1 and len(numeric_cols) == 1:
+                if row_count <= _MAX_BAR_CATEGORIES:
+                    return {"chart_type": "bar", "reason": "Numeric values per category"}
+                if row_count <= _MAX_CHART_ROWS:
+                    return {"chart_type": "pie", "reason": "Share of a numeric total across categories"}
+        if row_count > _MAX_CHART_ROWS or len(columns) > 2:
+            return {"chart_type": "table", "reason": "Too many rows or columns to chart clearly"}
+        return None
     
-    def suggest_visualization_for_results(self, query_results: Dict[str, Any], user_query: str) -> Dict[str, Any]:
+    async def suggest_visualization_for_results(self, query_results: Dict[str, Any], user_query: str) -> Dict[str, Any]:
         """Suggest visualization type based on query results"""
         try:
             # Create context about the results
@@ -269,6 +259,20 @@ Remember: You can only query the tables and columns that exist in the schema abo
             data_types = query_results.get("data_types", {})
             row_count = query_results.get("row_count", 0)
             
+            # Most result shapes have an obvious chart; only ask the LLM when they don't
+            local_suggestion = self._suggest_viz_local(columns, data_types, row_count)
+            if local_suggestion:
+                local_suggestion["title"] = f"Results for: {user_query}"
+                return {
+                    "success": True,
+                    "visualization": local_suggestion
+                }
+            
+            cache_key = (tuple(columns), tuple(sorted(data_types.items())), row_count, self._canonicalize(user_query))
+            cached = self._get_cached(self._viz_cache, cache_key)
+            if cached is not None:
+                return cached
+            
             context = f"""
 Query Results Summary:
 - Columns: {', '.join(columns)}
@@ -279,24 +283,28 @@ Query Results Summary:
 Based on this data, suggest the best visualization type.
 """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
+            # A 1-of-5 classification does not need the large model
+            response = await self.client.chat.completions.create(
+                model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are a data visualization expert. Analyze query results and suggest the best chart type."},
                     {"role": "user", "content": context}
                 ],
-                functions=[self.functions[2]],  # suggest_visualization function
+                functions=[self.functions["suggest_visualization"]],
                 function_call={"name": "suggest_visualization"},
-                temperature=0.1
+                temperature=0.1,
+                max_tokens=60
             )
             
             message = response.choices[0].message
             if message.function_call and message.function_call.name == "suggest_visualization":
                 viz_args = json.loads(message.function_call.arguments)
-                return {
+                viz_result = {
                     "success": True,
                     "visualization": viz_args
                 }
+                self._store_cached(self._viz_cache, cache_key, viz_result)
+                return viz_result
             
             return {
                 "success": False,
@@ -304,7 +312,7 @@ Based on this data, suggest the best visualization type.
             }
             
         except Exception as e:
-            logger.error(f"Visualization suggestion failed: {e}")
+            logger.error("Visualization suggestion failed: %s", e)
             return {
                 "success": False,
                 "error": f"Visualization suggestion failed: {str(e)}"
@@ -4,18 +4,31 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
+    # Paths (resolved once at import)
+    PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    DEFAULT_SQLITE_CONNECTION_STRING = f"sqlite:///{os.path.join(PROJECT_ROOT, 'test_database.db')}"
+    
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     
     # Database Configuration
     DEFAULT_DB_TIMEOUT = 30  # seconds
     MAX_QUERY_ROWS = 10000
+    SCHEMA_CACHE_TTL = 300  # seconds
+    SCHEMA_CACHE_SIZE = 64
+    RESULT_CACHE_TTL = 60  # seconds
+    RESULT_CACHE_SIZE = 256
+    ENGINE_CACHE_SIZE = 8
+    
+    # LLM response caches (generated SQL, chart suggestions, system prompts)
+    LLM_CACHE_TTL = 600  # seconds
+    LLM_CACHE_SIZE = 256
     
     # Security Settings
     ALLOWED_QUERY_TYPES = ["SELECT", "WITH"]
     FORBIDDEN_KEYWORDS = [
         "DROP", "DELETE", "UPDATE", "INSERT", "ALTER", 
-        "CREATE", "TRUNCATE", "GRANT", "REVOKE"
+        "CREATE", "TRUNCATE", "GRANT", "REVOKE", "INTO"
     ]
     
     # CORS Settings
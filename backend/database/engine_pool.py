@@ -0,0 +1,67 @@
+from typing import Optional, TYPE_CHECKING
+from collections import OrderedDict
+import logging
+import os
+import threading
+from config import Config
+
+# SQLAlchemy is imported on first engine creation rather than at process start
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Engines (and their connection pools) are shared process-wide by every
+# SchemaInspector and QueryExecutor talking to the same database
+_ENGINE_CACHE: "OrderedDict[str, Engine]" = OrderedDict()
+_ENGINE_CACHE_LOCK = threading.Lock()
+
+def resolve_connection_string(connection_string: str) -> str:
+    """Make relative SQLite paths absolute from the project root"""
+    if connection_string.startswith('sqlite:///'):
+        db_path = connection_string.replace('sqlite:///', '')
+        if not os.path.isabs(db_path):
+            db_path = os.path.join(Config.PROJECT_ROOT, db_path)
+        connection_string = f'sqlite:///{db_path}'
+    return connection_string
+
+def get_engine(connection_string: str) -> "Engine":
+    """Return the pooled engine for a connection string, creating it on first use"""
+    from sqlalchemy import create_engine
+    
+    connection_string = resolve_connection_string(connection_string)
+    evicted = []
+    with _ENGINE_CACHE_LOCK:
+        engine = _ENGINE_CACHE.get(connection_string)
+        if engine is None:
+            if connection_string.startswith('sqlite'):
+                # SQLAlchemy pools file-based SQLite connections itself; allow them
+                # to be handed to whichever worker thread checks them out
+                engine = create_engine(connection_string, connect_args={"check_same_thread": False})
+            else:
+                engine = create_engine(
+                    connection_string,
+                    pool_size=5,
+                    max_overflow=10,
+                    pool_pre_ping=True,
+                    pool_recycle=1800
+                )
+            _ENGINE_CACHE[connection_string] = engine
+            while len(_ENGINE_CACHE) > Config.ENGINE_CACHE_SIZE:
+                evicted.append(_ENGINE_CACHE.popitem(last=False)[1])
+        _ENGINE_CACHE.move_to_end(connection_string)
+
+    # Closing pooled connections can block, so do it outside the lock
+    for old_engine in evicted:
+        logger.debug("Disposing least recently used engine %s", old_engine.url.render_as_string())
+        old_engine.dispose()
+    return engine
+
+def dispose_engine(connection_string: Optional[str]) -> None:
+    """Close an engine's pooled connections and forget it"""
+    if not connection_string:
+        return
+    with _ENGINE_CACHE_LOCK:
+        engine = _ENGINE_CACHE.pop(resolve_connection_string(connection_string), None)
+    if engine is not None:
+        engine.dispose()
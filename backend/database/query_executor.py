@@ -1,72 +1,200 @@
-import pandas as pd
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
-from typing import Dict, List, Any, Optional
+import sqlglot
+from sqlglot import expressions as exp
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.tokens import TokenType
+from typing import Dict, List, Any, Optional, Tuple
 import logging
 import re
-import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
 from config import Config
+from database.engine_pool import get_engine
 
 logger = logging.getLogger(__name__)
 
+# Statement node types that make a query unsafe, keyed by the keyword reported to the user.
+# TRUNCATE/GRANT/REVOKE have no dedicated node and surface as exp.Command.
+_FORBIDDEN_NODES = {
+    "DROP": exp.Drop,
+    "DELETE": exp.Delete,
+    "UPDATE": exp.Update,
+    "INSERT": exp.Insert,
+    "ALTER": exp.AlterTable,
+    "CREATE": exp.Create,
+    # SELECT ... INTO creates a table on PostgreSQL
+    "INTO": exp.Into
+}
+_FORBIDDEN_KEYWORDS = {keyword.strip().upper() for keyword in Config.FORBIDDEN_KEYWORDS}
+_FORBIDDEN_NODE_TYPES = tuple(node for keyword, node in _FORBIDDEN_NODES.items() if keyword in _FORBIDDEN_KEYWORDS)
+# Root node types produced by SELECT / WITH ... SELECT / set operations
+_ALLOWED_ROOT_TYPES = (exp.Select, exp.Union)
+# Results of queries using these functions change between runs, so they are never cached
+_VOLATILE_RE = re.compile(r"\b(NOW|RANDOM|RAND)\s*\(|\bCURRENT_(TIMESTAMP|DATE|TIME)\b|'now'", re.IGNORECASE)
+
+# SQLite hands dates back as ISO 8601 text; such columns are reported as dates
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_ISO_DATETIME_RE = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?")
+
+# SQLAlchemy dialect name -> sqlglot dialect name
+_SQLGLOT_DIALECTS = {
+    "postgresql": "postgres",
+    "sqlite": "sqlite",
+    "mysql": "mysql"
+}
+
+@lru_cache(maxsize=512)
+def _parse_sql(query: str, dialect: Optional[str]) -> Tuple[exp.Expression, ...]:
+    """Parse a query once; validation, LIMIT injection and explanation share the trees"""
+    return tuple(statement for statement in sqlglot.parse(query, read=dialect) if statement is not None)
+
+def _has_limit(tree: exp.Expression) -> bool:
+    """Whether the outermost query already carries a LIMIT (or FETCH) clause"""
+    # For set operations sqlglot attaches a trailing LIMIT to the right-most SELECT
+    while isinstance(tree, exp.Union):
+        tree = tree.expression
+    return tree.args.get("limit") is not None
+
 class QueryExecutor:
     def __init__(self, connection_string: str):
         self.connection_string = connection_string
-        
-        # Handle SQLite connection strings
-        if connection_string.startswith('sqlite:///'):
-            db_path = connection_string.replace('sqlite:///', '')
-            if not os.path.isabs(db_path):
-                # Make relative path absolute from project root
-                project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                db_path = os.path.join(project_root, db_path)
-            connection_string = f'sqlite:///{db_path}'
-        
-        self.engine = create_engine(connection_string)
+        self.engine = get_engine(connection_string)
+        self._result_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+    
+    def _get_cached_result(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return a cached successful result for this query if it has not expired"""
+        with self._result_cache_lock:
+            cached = self._result_cache.get(query)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[0] >= Config.RESULT_CACHE_TTL:
+                del self._result_cache[query]
+                return None
+            self._result_cache.move_to_end(query)
+            # Callers get their own top-level dict; rows are treated as read-only downstream
+            return dict(cached[1])
+    
+    def _store_cached_result(self, query: str, result: Dict[str, Any]) -> None:
+        """Cache a successful result, evicting the least recently used entry when full"""
+        with self._result_cache_lock:
+            self._result_cache[query] = (time.monotonic(), dict(result))
+            self._result_cache.move_to_end(query)
+            while len(self._result_cache) > Config.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+    
+    def clear_result_cache(self) -> None:
+        """Drop all cached query results"""
+        with self._result_cache_lock:
+            self._result_cache.clear()
+    
+    def _parse(self, query: str) -> Tuple[exp.Expression, ...]:
+        """Parse a query with the sqlglot dialect matching this engine"""
+        return _parse_sql(query.strip().rstrip(';').rstrip(), _SQLGLOT_DIALECTS.get(self.engine.dialect.name))
     
     def validate_query(self, query: str) -> Dict[str, Any]:
         """Validate SQL query for safety and correctness"""
-        query_upper = query.upper().strip()
-        
-        # Check for forbidden keywords
-        for keyword in Config.FORBIDDEN_KEYWORDS:
-            if keyword in query_upper:
-                return {
-                    "valid": False,
-                    "error": f"Query contains forbidden keyword: {keyword}",
-                    "safe": False
-                }
+        try:
+            statements = self._parse(query)
+        except sqlglot.errors.SqlglotError as e:
+            # TokenError (e.g. an unterminated string) carries no structured errors
+            errors = getattr(e, "errors", None)
+            detail = errors[0].get("description") if errors else str(e)
+            return {
+                "valid": False,
+                "error": f"Query could not be parsed: {detail}",
+                "safe": False
+            }
         
-        # Check if query starts with allowed types
-        if not any(query_upper.startswith(allowed) for allowed in Config.ALLOWED_QUERY_TYPES):
+        # Only a single statement may be executed
+        if len(statements) != 1:
             return {
                 "valid": False,
-                "error": "Query must start with SELECT or WITH",
+                "error": "Query contains potentially dangerous patterns",
                 "safe": False
             }
+        tree = statements[0]
         
-        # Basic SQL injection protection
-        dangerous_patterns = [
-            r';\s*(DROP|DELETE|UPDATE|INSERT|ALTER|CREATE|TRUNCATE)',
-            r'--',
-            r'/\*.*\*/',
-            r'UNION\s+SELECT',
-            r'EXEC\s*\(',
-            r'EXECUTE\s*\('
-        ]
+        # Check for forbidden statements anywhere in the tree (including CTEs);
+        # identifiers such as created_at or updated_by are never mistaken for them
+        node = tree.find(*_FORBIDDEN_NODE_TYPES, exp.Command)
+        if isinstance(node, exp.Command):
+            keyword = str(node.this).upper()
+            return {
+                "valid": False,
+                "error": f"Query contains forbidden keyword: {keyword}" if keyword in _FORBIDDEN_KEYWORDS
+                else "Query contains potentially dangerous patterns",
+                "safe": False
+            }
+        if node is not None:
+            keyword = next(k for k, node_type in _FORBIDDEN_NODES.items() if isinstance(node, node_type))
+            return {
+                "valid": False,
+                "error": f"Query contains forbidden keyword: {keyword}",
+                "safe": False
+            }
         
-        for pattern in dangerous_patterns:
-            if re.search(pattern, query_upper, re.IGNORECASE):
-                return {
-                    "valid": False,
-                    "error": "Query contains potentially dangerous patterns",
-                    "safe": False
-                }
+        # Check if query is a SELECT / WITH query
+        if not isinstance(tree, _ALLOWED_ROOT_TYPES):
+            return {
+                "valid": False,
+                "error": "Query must start with SELECT or WITH",
+                "safe": False
+            }
         
         return {"valid": True, "safe": True}
     
-    def execute_query(self, query: str) -> Dict[str, Any]:
+    def _inject_limit(self, query: str, limit: int) -> str:
+        """Append a LIMIT clause when the outermost query does not already have one"""
+        query = query.strip().rstrip(';').rstrip()
+        if _has_limit(self._parse(query)[0]):
+            return query
+        # Cut the query after its last real token, so trailing semicolons and
+        # comments (e.g. "SELECT 1; -- done") cannot separate it from the LIMIT
+        tokens = Dialect.get_or_raise(_SQLGLOT_DIALECTS.get(self.engine.dialect.name)).tokenize(query)
+        while tokens and tokens[-1].token_type == TokenType.SEMICOLON:
+            tokens.pop()
+        if tokens:
+            query = query[:tokens[-1].end + 1]
+        return f"{query}\nLIMIT {limit}"
+    
+    def get_tables_used(self, query: str) -> List[str]:
+        """List the tables a query reads from, skipping CTE aliases"""
+        tables = []
+        for tree in self._parse(query):
+            cte_names = {cte.alias for cte in tree.find_all(exp.CTE)}
+            tables.extend(table.name for table in tree.find_all(exp.Table) if table.name not in cte_names)
+        return list(dict.fromkeys(tables))
+    
+    @staticmethod
+    def _infer_data_types(rows: List[Dict[str, Any]], columns: List[str]) -> Dict[str, str]:
+        """Name each column's type after its first non-null value, recognizing ISO date strings"""
+        data_types = {}
+        for col in columns:
+            value = next((row[col] for row in rows if row[col] is not None), None)
+            if isinstance(value, str) and _ISO_DATE_RE.fullmatch(value):
+                data_types[col] = "date"
+            elif isinstance(value, str) and _ISO_DATETIME_RE.fullmatch(value):
+                data_types[col] = "datetime"
+            else:
+                data_types[col] = type(value).__name__ if value is not None else "object"
+        return data_types
+    
+    def execute_query(self, query: str, use_cache: bool = True) -> Dict[str, Any]:
         """Execute SQL query and return results"""
+        # Already loaded by the time an executor exists; imported here to keep module import light
+        from sqlalchemy import text
+        from sqlalchemy.exc import SQLAlchemyError
+        
+        cache_key = query.strip()
+        use_cache = use_cache and not _VOLATILE_RE.search(cache_key)
+        if use_cache:
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                return cached
+        
         # Validate query first
         validation = self.validate_query(query)
         if not validation["valid"]:
@@ -78,31 +206,39 @@ class QueryExecutor:
             }
         
         try:
+            # Push the row cap down to the database; one extra row tells us
+            # whether the result was truncated
+            limited_query = self._inject_limit(query, Config.MAX_QUERY_ROWS + 1)
+            
             with self.engine.connect() as conn:
-                # Execute query with timeout
-                result = conn.execute(
-                    text(query),
+                # Execute query with timeout on a server-side cursor
+                result = conn.execution_options(stream_results=True).execute(
+                    text(limited_query),
                     execution_options={"timeout": Config.DEFAULT_DB_TIMEOUT}
                 )
                 
-                # Convert to DataFrame
-                df = pd.DataFrame(result.fetchall(), columns=result.keys())
+                columns = list(result.keys())
                 
-                # Limit rows if necessary
-                if len(df) > Config.MAX_QUERY_ROWS:
-                    df = df.head(Config.MAX_QUERY_ROWS)
-                    logger.warning(f"Query result truncated to {Config.MAX_QUERY_ROWS} rows")
+                # Map rows straight to dicts, reading at most one row past the limit
+                rows = [dict(row) for row in islice(result.mappings(), Config.MAX_QUERY_ROWS + 1)]
+                result.close()
+                if len(rows) > Config.MAX_QUERY_ROWS:
+                    rows = rows[:Config.MAX_QUERY_ROWS]
+                    logger.warning("Query result truncated to %s rows", Config.MAX_QUERY_ROWS)
                 
-                return {
+                query_results = {
                     "success": True,
-                    "data": df.to_dict('records'),
-                    "columns": list(df.columns),
-                    "row_count": len(df),
-                    "data_types": df.dtypes.astype(str).to_dict()
+                    "data": rows,
+                    "columns": columns,
+                    "row_count": len(rows),
+                    "data_types": self._infer_data_types(rows, columns)
                 }
+                if use_cache:
+                    self._store_cached_result(cache_key, query_results)
+                return query_results
                 
         except SQLAlchemyError as e:
-            logger.error(f"Database query failed: {e}")
+            logger.error("Database query failed: %s", e)
             return {
                 "success": False,
                 "error": str(e),
@@ -110,7 +246,7 @@ class QueryExecutor:
                 "row_count": 0
             }
         except Exception as e:
-            logger.error(f"Unexpected error during query execution: {e}")
+            logger.error("Unexpected error during query execution: %s", e)
             return {
                 "success": False,
                 "error": f"Unexpected error: {str(e)}",
@@ -121,29 +257,25 @@ class QueryExecutor:
     def get_query_explanation(self, query: str) -> str:
         """Generate a human-readable explanation of what the query does"""
         try:
-            # Parse query to extract basic information
-            query_upper = query.upper()
+            # Parse query into an AST to extract basic information
+            tree = self._parse(query)[0]
+            select = tree if isinstance(tree, exp.Select) else tree.find(exp.Select)
+            if select is None:
+                return "Query explanation could not be generated."
             
-            # Extract table names (basic regex)
-            table_pattern = r'FROM\s+(\w+)'
-            tables = re.findall(table_pattern, query_upper)
+            # Extract table names
+            tables = self.get_tables_used(query)
             
             # Extract column names
-            select_pattern = r'SELECT\s+(.*?)\s+FROM'
-            select_match = re.search(select_pattern, query_upper)
-            columns = []
-            if select_match:
-                columns = [col.strip() for col in select_match.group(1).split(',')]
+            columns = [column.sql() for column in select.expressions]
             
             # Extract WHERE conditions
-            where_pattern = r'WHERE\s+(.*?)(?:\s+GROUP\s+BY|\s+ORDER\s+BY|\s+LIMIT|$)'
-            where_match = re.search(where_pattern, query_upper)
-            conditions = where_match.group(1) if where_match else None
+            where = select.args.get("where")
+            conditions = where.this.sql() if where else None
             
             # Extract GROUP BY
-            group_pattern = r'GROUP\s+BY\s+(.*?)(?:\s+ORDER\s+BY|\s+LIMIT|$)'
-            group_match = re.search(group_pattern, query_upper)
-            group_by = group_match.group(1) if group_match else None
+            group = select.args.get("group")
+            group_by = ", ".join(e.sql() for e in group.expressions) if group else None
             
             # Build explanation
             explanation_parts = []
@@ -163,5 +295,5 @@ class QueryExecutor:
             return " ".join(explanation_parts) + "."
             
         except Exception as e:
-            logger.error(f"Failed to generate query explanation: {e}")
+            logger.error("Failed to generate query explanation: %s", e)
             return "Query explanation could not be generated."
@@ -1,51 +1,152 @@
-import psycopg2
-from sqlalchemy import create_engine, MetaData, inspect, text
-from sqlalchemy.exc import SQLAlchemyError
 import json
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+from collections import OrderedDict
+import base64
+import hashlib
+import io
 import logging
-import os
+import orjson
+import threading
+import time
+from config import Config
+from database.engine_pool import get_engine, dispose_engine
 
 logger = logging.getLogger(__name__)
 
+# Positional DBAPI parameter placeholder per PEP 249 paramstyle
+_PARAM_MARKERS = {
+    "qmark": "?",
+    "format": "%s",
+    "pyformat": "%s",
+    "numeric": ":1"
+}
+
 class SchemaInspector:
     def __init__(self):
         self.engine = None
-        self.schema_cache = {}
+        self.connection_string = None
+        # Keyed by a hash of the connection string so credentials are not kept as cache keys
+        # Entries are (stored_at, schema_info, serialized JSON once /api/schema has asked for it)
+        self.schema_cache: "OrderedDict[str, Tuple[float, Dict[str, Any], Optional[bytes]]]" = OrderedDict()
+        self._schema_cache_lock = threading.Lock()
+        self._reflect_lock = threading.Lock()
+        self._inspector = None
+    
+    @staticmethod
+    def _cache_key(connection_string: str) -> str:
+        return hashlib.sha256(connection_string.encode()).hexdigest()
+    
+    def _get_cached_schema(self, connection_string: str) -> Optional[Dict[str, Any]]:
+        """Return the cached schema if present and younger than the TTL"""
+        key = self._cache_key(connection_string)
+        with self._schema_cache_lock:
+            cached = self.schema_cache.get(key)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[0] >= Config.SCHEMA_CACHE_TTL:
+                del self.schema_cache[key]
+                return None
+            self.schema_cache.move_to_end(key)
+            return cached[1]
+    
+    def _store_schema(self, connection_string: str, schema_info: Dict[str, Any]) -> None:
+        """Cache a schema, evicting the least recently used entry when full"""
+        key = self._cache_key(connection_string)
+        with self._schema_cache_lock:
+            self.schema_cache[key] = (time.monotonic(), schema_info, None)
+            self.schema_cache.move_to_end(key)
+            while len(self.schema_cache) > Config.SCHEMA_CACHE_SIZE:
+                self.schema_cache.popitem(last=False)
+    
+    def get_schema_json(self, connection_string: str) -> bytes:
+        """Return the schema serialized as JSON, serializing each cached schema only once"""
+        schema_info = self.get_schema(connection_string)
+        key = self._cache_key(connection_string)
+        with self._schema_cache_lock:
+            cached = self.schema_cache.get(key)
+            if cached is not None and cached[1] is schema_info and cached[2] is not None:
+                return cached[2]
+        
+        schema_json = orjson.dumps(schema_info, default=str)
+        with self._schema_cache_lock:
+            cached = self.schema_cache.get(key)
+            if cached is not None and cached[1] is schema_info:
+                self.schema_cache[key] = (cached[0], schema_info, schema_json)
+        return schema_json
+    
+    def invalidate_schema(self, connection_string: Optional[str] = None) -> None:
+        """Forget the cached schema for one connection, or for all when none is given"""
+        with self._schema_cache_lock:
+            if connection_string is None:
+                self.schema_cache.clear()
+            else:
+                self.schema_cache.pop(self._cache_key(connection_string), None)
     
     def connect(self, connection_string: str) -> bool:
-        """Connect to database (PostgreSQL or SQLite) and cache connection"""
+        """Connect to database (PostgreSQL or SQLite) using the shared engine pool"""
+        # SQLAlchemy is only loaded once a database is actually used
+        from sqlalchemy import text
+        
         try:
-            # Handle SQLite connection strings
-            if connection_string.startswith('sqlite:///'):
-                # Convert to absolute path for SQLite
-                db_path = connection_string.replace('sqlite:///', '')
-                if not os.path.isabs(db_path):
-                    # Make relative path absolute from project root
-                    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                    db_path = os.path.join(project_root, db_path)
-                connection_string = f'sqlite:///{db_path}'
-            
-            self.engine = create_engine(connection_string)
+            self.engine = get_engine(connection_string)
+            self.connection_string = connection_string
+            self._inspector = None
             # Test connection
             with self.engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
             return True
         except Exception as e:
-            logger.error(f"Database connection failed: {e}")
+            logger.error("Database connection failed: %s", e)
+            # Don't keep a pool around for a database we could not reach
+            dispose_engine(connection_string)
+            self.engine = None
+            self.connection_string = None
             return False
     
+    def _get_inspector(self):
+        """Return the inspector for the current engine, creating it on first use.
+        
+        The inspector memoizes reflection results, so reusing it avoids repeating
+        metadata queries against the database.
+        """
+        if self._inspector is None:
+            from sqlalchemy import inspect
+            self._inspector = inspect(self.engine)
+        return self._inspector
+    
+    def disconnect(self) -> None:
+        """Dispose the shared engine for this connection and drop the cached inspector"""
+        dispose_engine(self.connection_string)
+        self.engine = None
+        self.connection_string = None
+        self._inspector = None
+    
     def get_schema(self, connection_string: str) -> Dict[str, Any]:
         """Extract and return database schema information"""
-        if connection_string in self.schema_cache:
-            return self.schema_cache[connection_string]
+        cached = self._get_cached_schema(connection_string)
+        if cached is not None:
+            return cached
         
-        # Always reconnect to ensure fresh connection
-        if not self.connect(connection_string):
-            raise Exception("Failed to connect to database")
+        # Reflection swaps the shared engine and inspector, so only one thread runs it
+        # at a time; threads that waited find the schema cached and skip reflecting
+        with self._reflect_lock:
+            cached = self._get_cached_schema(connection_string)
+            if cached is not None:
+                return cached
+            return self._reflect_schema(connection_string)
+    
+    def _reflect_schema(self, connection_string: str) -> Dict[str, Any]:
+        """Reflect the schema from the database and cache it"""
+        # Reuse the pooled engine when it already points at this database
+        if self.engine is None or self.connection_string != connection_string:
+            if not self.connect(connection_string):
+                raise Exception("Failed to connect to database")
+        else:
+            # The inspector memoizes reflection; start fresh so a cache miss sees schema changes
+            self._inspector = None
         
         try:
-            inspector = inspect(self.engine)
+            inspector = self._get_inspector()
             schema_info = {
                 "tables": {},
                 "relationships": [],
@@ -55,92 +156,178 @@ class SchemaInspector:
             # Get all table names
             table_names = inspector.get_table_names()
             
-            for table_name in table_names:
+            # Reflect columns, primary keys and foreign keys for all tables in
+            # bulk (one query per category) instead of per-table round trips
+            all_columns = inspector.get_multi_columns(filter_names=table_names)
+            all_pk_constraints = inspector.get_multi_pk_constraint(filter_names=table_names)
+            all_foreign_keys = inspector.get_multi_foreign_keys(filter_names=table_names)
+            
+            # Tables, relationships and the natural language description are all
+            # built in a single pass over the reflected tables and foreign keys
+            relationships = schema_info["relationships"]
+            description = io.StringIO()
+            
+            for index, table_name in enumerate(table_names):
+                key = (None, table_name)
+                
                 # Get column information
-                columns = inspector.get_columns(table_name)
+                pk_columns = set(all_pk_constraints.get(key, {}).get('constrained_columns') or [])
                 column_info = {}
+                primary_keys = []
                 
-                for column in columns:
+                for column in all_columns.get(key, []):
+                    is_primary_key = column['name'] in pk_columns
                     column_info[column['name']] = {
                         "type": str(column['type']),
                         "nullable": column['nullable'],
                         "default": column.get('default'),
-                        "primary_key": column.get('primary_key', False)
+                        "primary_key": is_primary_key
                     }
+                    if is_primary_key:
+                        primary_keys.append(column['name'])
+                
+                if index:
+                    description.write(". ")
+                description.write("Table '")
+                description.write(table_name)
+                description.write("' contains columns: ")
+                description.write(", ".join(column_info))
+                if primary_keys:
+                    description.write(" (primary key: ")
+                    description.write(", ".join(primary_keys))
+                    description.write(")")
                 
                 # Get foreign key relationships
-                foreign_keys = inspector.get_foreign_keys(table_name)
                 fk_info = []
-                for fk in foreign_keys:
+                for fk_index, fk in enumerate(all_foreign_keys.get(key, [])):
+                    column = fk['constrained_columns'][0]
+                    referenced_table = fk['referred_table']
+                    referenced_column = fk['referred_columns'][0]
                     fk_info.append({
-                        "column": fk['constrained_columns'][0],
-                        "referenced_table": fk['referred_table'],
-                        "referenced_column": fk['referred_columns'][0]
+                        "column": column,
+                        "referenced_table": referenced_table,
+                        "referenced_column": referenced_column
+                    })
+                    relationships.append({
+                        "from_table": table_name,
+                        "from_column": column,
+                        "to_table": referenced_table,
+                        "to_column": referenced_column
                     })
+                    
+                    description.write("; " if fk_index else ". Foreign keys: ")
+                    description.write(column)
+                    description.write(" references ")
+                    description.write(referenced_table)
+                    description.write(".")
+                    description.write(referenced_column)
                 
                 schema_info["tables"][table_name] = {
                     "columns": column_info,
                     "foreign_keys": fk_info
                 }
-                
-                # Add to relationships
-                for fk in fk_info:
-                    schema_info["relationships"].append({
-                        "from_table": table_name,
-                        "from_column": fk["column"],
-                        "to_table": fk["referenced_table"],
-                        "to_column": fk["referenced_column"]
-                    })
             
-            # Generate natural language description
-            schema_info["natural_language_description"] = self._generate_schema_description(schema_info)
+            description.write(".")
+            schema_info["natural_language_description"] = description.getvalue()
             
             # Cache the schema
-            self.schema_cache[connection_string] = schema_info
+            self._store_schema(connection_string, schema_info)
             return schema_info
             
         except Exception as e:
-            logger.error(f"Schema extraction failed: {e}")
+            logger.error("Schema extraction failed: %s", e)
             raise Exception(f"Failed to extract schema: {e}")
     
-    def _generate_schema_description(self, schema_info: Dict[str, Any]) -> str:
-        """Generate a natural language description of the database schema"""
-        description_parts = []
-        
-        for table_name, table_info in schema_info["tables"].items():
-            columns = list(table_info["columns"].keys())
-            primary_keys = [col for col, info in table_info["columns"].items() if info["primary_key"]]
-            
-            table_desc = f"Table '{table_name}' contains columns: {', '.join(columns)}"
-            if primary_keys:
-                table_desc += f" (primary key: {', '.join(primary_keys)})"
-            
-            # Add foreign key information
-            if table_info["foreign_keys"]:
-                fk_descriptions = []
-                for fk in table_info["foreign_keys"]:
-                    fk_descriptions.append(f"{fk['column']} references {fk['referenced_table']}.{fk['referenced_column']}")
-                table_desc += f". Foreign keys: {'; '.join(fk_descriptions)}"
-            
-            description_parts.append(table_desc)
-        
-        return ". ".join(description_parts) + "."
+    @staticmethod
+    def _encode_page_token(last_key: List[Any]) -> str:
+        """Serialize the last primary key seen into an opaque page token"""
+        return base64.urlsafe_b64encode(json.dumps(last_key, default=str).encode()).decode()
     
-    def get_table_sample_data(self, table_name: str, limit: int = 5) -> List[Dict]:
-        """Get sample data from a table for context"""
+    @staticmethod
+    def _decode_page_token(page_token: str, key_length: int) -> List[Any]:
+        """Recover the primary key values a page token was built from"""
+        try:
+            last_key = json.loads(base64.urlsafe_b64decode(page_token.encode()))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid page token")
+        if not isinstance(last_key, list) or len(last_key) != key_length:
+            raise ValueError("Invalid page token")
+        return last_key
+    
+    def get_table_sample_data(self, table_name: str, limit: int = 5,
+                              page_token: Optional[str] = None) -> Tuple[List[str], List[Tuple], Optional[str]]:
+        """Get one page of sample data from a table as (columns, rows, next page token)"""
         if not self.engine:
             raise Exception("No database connection")
         
+        inspector = self._get_inspector()
+        # Only ever interpolate known table and column names, quoted for the dialect
+        if table_name not in inspector.get_table_names():
+            raise ValueError(f"Unknown table: {table_name}")
+        
+        # Keyset pagination on the primary key keeps each page O(limit) however
+        # deep the client pages; tables without a primary key get a single page
+        pk_columns = inspector.get_pk_constraint(table_name).get('constrained_columns') or []
+        if page_token and not pk_columns:
+            raise ValueError(f"Table '{table_name}' has no primary key to page on")
+        last_key = self._decode_page_token(page_token, len(pk_columns)) if page_token else None
+        # Keep the page bounded whatever the caller asks for
+        limit = max(1, min(int(limit), Config.MAX_QUERY_ROWS))
+        
         try:
-            with self.engine.connect() as conn:
-                result = conn.execute(f"SELECT * FROM {table_name} LIMIT {limit}")
-                columns = result.keys()
-                rows = result.fetchall()
-                
-                return [dict(zip(columns, row)) for row in rows]
+            dialect = self.engine.dialect
+            preparer = dialect.identifier_preparer
+            named = dialect.paramstyle == "named"
+            params = {} if named else []
+            
+            def bind(value):
+                if named:
+                    name = f"p{len(params)}"
+                    params[name] = value
+                    return f":{name}"
+                params.append(value)
+                return _PARAM_MARKERS[dialect.paramstyle]
+            
+            sql = io.StringIO()
+            sql.write(f"SELECT * FROM {preparer.quote(table_name)}")
+            if pk_columns:
+                quoted_pk = ", ".join(preparer.quote(col) for col in pk_columns)
+                if last_key is not None:
+                    markers = ", ".join(bind(value) for value in last_key)
+                    if len(pk_columns) == 1:
+                        sql.write(f" WHERE {quoted_pk} > {markers}")
+                    else:
+                        sql.write(f" WHERE ({quoted_pk}) > ({markers})")
+                sql.write(f" ORDER BY {quoted_pk}")
+            sql.write(f" LIMIT {bind(limit)}")
+            
+            # Read through the raw DBAPI cursor; SQLAlchemy Row construction is
+            # pure overhead for a plain SELECT *
+            raw_conn = self.engine.raw_connection()
+            cursor = None
+            try:
+                cursor = raw_conn.cursor()
+                if dialect.name == 'postgresql':
+                    # Bound the sample read server-side; SET LOCAL ends with the
+                    # transaction, which the pool rolls back on check-in
+                    cursor.execute(f"SET LOCAL statement_timeout = {int(Config.DEFAULT_DB_TIMEOUT * 1000)}")
+                cursor.execute(sql.getvalue(), params)
+                columns = [description[0] for description in cursor.description]
+                rows = cursor.fetchall()
+            finally:
+                if cursor is not None:
+                    cursor.close()
+                raw_conn.close()
+            
+            # Rows stay as DBAPI tuples; the column names are sent once alongside them
+            next_page_token = None
+            if pk_columns and rows and len(rows) == limit:
+                last_row = rows[-1]
+                next_page_token = self._encode_page_token([last_row[columns.index(col)] for col in pk_columns])
+            return columns, rows, next_page_token
         except Exception as e:
-            logger.error(f"Failed to get sample data from {table_name}: {e}")
-            return []
+            logger.error("Failed to get sample data from %s: %s", table_name, e)
+            return [], [], None
     
     def validate_table_exists(self, table_name: str) -> bool:
         """Check if a table exists in the database"""
@@ -148,7 +335,6 @@ class SchemaInspector:
             return False
         
         try:
-            inspector = inspect(self.engine)
-            return table_name in inspector.get_table_names()
+            return table_name in self._get_inspector().get_table_names()
         except Exception:
             return False
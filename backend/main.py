@@ -1,8 +1,10 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
 import logging
+import orjson
 import os
 from dotenv import load_dotenv
 from agents.orchestrator import QueryOrchestrator
@@ -19,7 +21,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Natural Language Database Query System",
     description="Convert natural language queries to SQL and visualize results",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -34,6 +37,21 @@ app.add_middleware(
 # Initialize orchestrator
 orchestrator = QueryOrchestrator()
 
+# Bodies of the constant endpoints, serialized once at import
+_HEALTH_BYTES = orjson.dumps({"status": "healthy", "message": "Natural Language Database Query System is running"})
+_ROOT_BYTES = orjson.dumps({
+    "message": "Natural Language Database Query System",
+    "version": "1.0.0",
+    "endpoints": {
+        "connect": "POST /api/connect",
+        "query": "POST /api/query",
+        "schema": "GET /api/schema",
+        "sample_data": "POST /api/sample-data",
+        "disconnect": "POST /api/disconnect",
+        "health": "GET /api/health"
+    }
+})
+
 # Pydantic models for request/response
 class DatabaseConnection(BaseModel):
     connection_string: Optional[str] = None
@@ -43,16 +61,18 @@ class QueryRequest(BaseModel):
 
 class SampleDataRequest(BaseModel):
     table_name: str
-    limit: Optional[int] = 5
+    limit: int = Field(5, ge=1, le=Config.MAX_QUERY_ROWS)
+    page_token: Optional[str] = None
 
 # API Endpoints
 @app.post("/api/connect")
 async def connect_database(connection: DatabaseConnection):
     """Connect to a PostgreSQL database"""
     try:
-        logger.info(f"Connecting to database: {connection.connection_string}")
-        result = orchestrator.connect_database(connection.connection_string)
-        logger.info(f"Connection result: {result['success']}, tables: {len(result.get('schema', {}).get('tables', {}))}")
+        logger.info("Connecting to database: %s", connection.connection_string)
+        result = await orchestrator.connect_database(connection.connection_string)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Connection result: %s, tables: %s", result['success'], len(result.get('schema', {}).get('tables', {})))
         
         if result["success"]:
             return {
@@ -65,14 +85,14 @@ async def connect_database(connection: DatabaseConnection):
             raise HTTPException(status_code=400, detail=result["error"])
             
     except Exception as e:
-        logger.error(f"Database connection error: {e}")
+        logger.error("Database connection error: %s", e)
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
 
 @app.post("/api/query")
 async def process_query(query_request: QueryRequest):
     """Process a natural language query"""
     try:
-        result = orchestrator.process_natural_language_query(query_request.query)
+        result = await orchestrator.process_natural_language_query(query_request.query)
         
         if result["success"]:
             return result
@@ -80,37 +100,39 @@ async def process_query(query_request: QueryRequest):
             raise HTTPException(status_code=400, detail=result["error"])
             
     except Exception as e:
-        logger.error(f"Query processing error: {e}")
+        logger.error("Query processing error: %s", e)
         raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
 
 @app.get("/api/schema")
 async def get_schema():
     """Get current database schema information"""
     try:
-        result = orchestrator.get_schema_info()
+        result = await orchestrator.get_schema_info_json()
         
         if result["success"]:
-            return result
+            return Response(content=result["content"], media_type="application/json")
         else:
             raise HTTPException(status_code=400, detail=result["error"])
             
     except Exception as e:
-        logger.error(f"Schema retrieval error: {e}")
+        logger.error("Schema retrieval error: %s", e)
         raise HTTPException(status_code=500, detail=f"Schema retrieval failed: {str(e)}")
 
 @app.post("/api/sample-data")
 async def get_sample_data(request: SampleDataRequest):
     """Get sample data from a specific table"""
     try:
-        result = orchestrator.get_sample_data(request.table_name, request.limit)
+        result = await orchestrator.get_sample_data(request.table_name, request.limit, request.page_token)
         
         if result["success"]:
             return result
         else:
             raise HTTPException(status_code=400, detail=result["error"])
             
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Sample data retrieval error: {e}")
+        logger.error("Sample data retrieval error: %s", e)
         raise HTTPException(status_code=500, detail=f"Sample data retrieval failed: {str(e)}")
 
 @app.post("/api/disconnect")
@@ -121,29 +143,18 @@ async def disconnect_database():
         return result
         
     except Exception as e:
-        logger.error(f"Database disconnection error: {e}")
+        logger.error("Database disconnection error: %s", e)
         raise HTTPException(status_code=500, detail=f"Database disconnection failed: {str(e)}")
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "message": "Natural Language Database Query System is running"}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "Natural Language Database Query System",
-        "version": "1.0.0",
-        "endpoints": {
-            "connect": "POST /api/connect",
-            "query": "POST /api/query", 
-            "schema": "GET /api/schema",
-            "sample_data": "POST /api/sample-data",
-            "disconnect": "POST /api/disconnect",
-            "health": "GET /api/health"
-        }
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
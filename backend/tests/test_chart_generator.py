@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from visualization.chart_generator import ChartGenerator
+
+class ChartGeneratorTest(unittest.TestCase):
+    def setUp(self):
+        self.generator = ChartGenerator()
+    
+    def chart_trace(self, data, columns, data_types, chart_type):
+        chart = self.generator.generate_chart(data, columns, data_types, chart_type=chart_type)
+        self.assertTrue(chart.get("success"), chart.get("error"))
+        return json.loads(chart["chart_data"])["data"][0]
+    
+    def test_pie_slices_sum_the_numeric_column(self):
+        data = [{"name": name, "price": price} for name, price in [("a", 2.5), ("b", 4.0), ("a", 1.5), ("c", 3.0)]]
+        trace = self.chart_trace(data, ["name", "price"], {"name": "str", "price": "float"}, "pie")
+        self.assertEqual(dict(zip(trace["labels"], trace["values"])), {"a": 4.0, "b": 4.0, "c": 3.0})
+    
+    def test_pie_counts_categories_without_a_numeric_column(self):
+        data = [{"name": name} for name in ["a", "b", "a"]]
+        trace = self.chart_trace(data, ["name"], {"name": "str"}, "pie")
+        self.assertEqual(dict(zip(trace["labels"], trace["values"])), {"a": 2, "b": 1})
+
+    def test_bar_chart_with_only_null_categories(self):
+        data = [{"name": None, "price": price} for price in (1.0, 2.0)]
+        self.chart_trace(data, ["name", "price"], {"name": "object", "price": "float"}, "bar")
+
+if __name__ == "__main__":
+    unittest.main()
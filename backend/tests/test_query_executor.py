@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from config import Config
+from database.engine_pool import dispose_engine
+from database.query_executor import QueryExecutor
+
+IN_MEMORY_DB = "sqlite://"
+
+class QueryExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.executor = QueryExecutor(IN_MEMORY_DB)
+        with self.executor.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (a INTEGER, created_at TEXT, updated_at TEXT)"))
+            conn.execute(text("CREATE TABLE u (a INTEGER)"))
+            conn.execute(text("INSERT INTO t VALUES (1, 'x', 'y'), (2, 'x', 'y'), (3, 'x', 'y')"))
+    
+    def tearDown(self):
+        dispose_engine(IN_MEMORY_DB)
+    
+    def assertRejected(self, query, error=None):
+        validation = self.executor.validate_query(query)
+        self.assertFalse(validation["valid"], query)
+        if error is not None:
+            self.assertEqual(validation["error"], error)
+    
+    def test_forbidden_statements_are_rejected(self):
+        self.assertRejected("DROP TABLE t", "Query contains forbidden keyword: DROP")
+        self.assertRejected("DELETE FROM t", "Query contains forbidden keyword: DELETE")
+        self.assertRejected("UPDATE t SET a = 1", "Query contains forbidden keyword: UPDATE")
+        self.assertRejected("INSERT INTO t (a) VALUES (1)", "Query contains forbidden keyword: INSERT")
+        self.assertRejected("CREATE TABLE v (a INTEGER)", "Query contains forbidden keyword: CREATE")
+        self.assertRejected("TRUNCATE TABLE t")
+        self.assertRejected("SELECT * INTO newt FROM t", "Query contains forbidden keyword: INTO")
+    
+    def test_multiple_statements_are_rejected(self):
+        self.assertRejected("SELECT a FROM t; DROP TABLE t")
+        self.assertRejected("SELECT a FROM t; SELECT a FROM u")
+    
+    def test_untokenizable_queries_fail_cleanly(self):
+        for query in ["SELECT 'abc", 'SELECT "abc', "SELECT 1 /* x", "SELECT [abc"]:
+            self.assertRejected(query)
+            result = self.executor.execute_query(query)
+            self.assertFalse(result["success"], query)
+            self.assertTrue(result["error"].startswith("Query could not be parsed"), result["error"])
+    
+    def test_keyword_like_identifiers_are_allowed(self):
+        self.assertTrue(self.executor.validate_query("SELECT created_at, updated_at FROM t")["valid"])
+    
+    def test_union_is_allowed_and_limited(self):
+        query = "SELECT a FROM t UNION SELECT a FROM u"
+        self.assertTrue(self.executor.validate_query(query)["valid"])
+        self.assertTrue(self.executor._inject_limit(query, 10).endswith("LIMIT 10"))
+        limited = "SELECT a FROM t UNION SELECT a FROM u LIMIT 5"
+        self.assertEqual(self.executor._inject_limit(limited, 10), limited)
+    
+    def test_iso_date_strings_are_typed_as_dates(self):
+        result = self.executor.execute_query(
+            "SELECT '2024-05-01' AS day, '2024-05-01 10:30:00' AS at, 'North' AS region, a FROM t"
+        )
+        self.assertEqual(result["data_types"], {"day": "date", "at": "datetime", "region": "str", "a": "int"})
+    
+    def test_limit_survives_trailing_line_comment(self):
+        limited = self.executor._inject_limit("SELECT a, created_at FROM t -- comment", 2)
+        with self.executor.engine.connect() as conn:
+            rows = conn.execute(text(limited)).fetchall()
+        self.assertEqual(len(rows), 2)
+        
+        for query in ["SELECT a FROM t; -- done", "SELECT a FROM t /* done */ ;", "SELECT 'x;' AS s, a FROM t;  "]:
+            result = self.executor.execute_query(query, use_cache=False)
+            self.assertTrue(result["success"], result.get("error"))
+        
+        with mock.patch.object(Config, "MAX_QUERY_ROWS", 2):
+            result = self.executor.execute_query("SELECT a, created_at FROM t -- comment", use_cache=False)
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["row_count"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,45 @@
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, NamedTuple, FrozenSet, Tuple, TYPE_CHECKING
+from functools import lru_cache
+from operator import itemgetter
 import logging
+import re
+
+# plotly and pandas are imported inside the chart helpers so that processes
+# which never draw a chart (or have not yet) do not pay for importing them
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 logger = logging.getLogger(__name__)
 
+_NUMERIC_DTYPE_RE = re.compile(r'int|float|numeric|double|decimal|real')
+_DATETIME_DTYPE_RE = re.compile(r'date|time')
+
+class ColumnClasses(NamedTuple):
+    numeric: Tuple[str, ...]
+    categorical: Tuple[str, ...]
+    datetime: Tuple[str, ...]
+
+@lru_cache(maxsize=128)
+def _classify_columns(columns: Tuple[str, ...], data_types: FrozenSet[Tuple[str, str]]) -> ColumnClasses:
+    """Split columns into numeric, categorical and datetime by their dtype names"""
+    dtypes = dict(data_types)
+    numeric, categorical, datetime = [], [], []
+    for col in columns:
+        if col in dtypes:
+            dtype = dtypes[col].lower()
+            if _NUMERIC_DTYPE_RE.search(dtype):
+                numeric.append(col)
+            elif _DATETIME_DTYPE_RE.search(dtype):
+                datetime.append(col)
+            else:
+                categorical.append(col)
+    # Tuples, since the memoized result is shared between callers
+    return ColumnClasses(tuple(numeric), tuple(categorical), tuple(datetime))
+
+def _project(data: List[Dict], *columns: str) -> Dict[str, List[Any]]:
+    """Pull just the named columns out of the row dicts, one list per column"""
+    return {col: [row.get(col) for row in data] for col in dict.fromkeys(columns)}
+
 class ChartGenerator:
     def __init__(self):
         self.chart_types = {
@@ -16,27 +50,19 @@ class ChartGenerator:
             "table": self._create_table_chart
         }
     
-    def analyze_data(self, data: List[Dict], columns: List[str], data_types: Dict[str, str]) -> Dict[str, Any]:
+    @staticmethod
+    def classify_columns(columns: List[str], data_types: Dict[str, str]) -> ColumnClasses:
+        """Classify columns once per result shape; results are memoized"""
+        return _classify_columns(tuple(columns), frozenset(data_types.items()))
+    
+    def analyze_data(self, data: List[Dict], columns: List[str], data_types: Dict[str, str],
+                     column_classes: Optional[ColumnClasses] = None) -> Dict[str, Any]:
         """Analyze data to determine the best visualization type"""
         if not data:
             return {"recommended_chart": "table", "reason": "No data available"}
         
-        df = pd.DataFrame(data)
-        
         # Count column types
-        numeric_cols = []
-        categorical_cols = []
-        datetime_cols = []
-        
-        for col in columns:
-            if col in data_types:
-                dtype = data_types[col].lower()
-                if 'int' in dtype or 'float' in dtype or 'numeric' in dtype:
-                    numeric_cols.append(col)
-                elif 'date' in dtype or 'time' in dtype:
-                    datetime_cols.append(col)
-                else:
-                    categorical_cols.append(col)
+        numeric_cols, categorical_cols, datetime_cols = column_classes or self.classify_columns(columns, data_types)
         
         # Determine best chart type based on data characteristics
         if len(columns) == 2:
@@ -68,143 +94,142 @@ class ChartGenerator:
         if not data:
             return {"error": "No data available for visualization"}
         
+        column_classes = self.classify_columns(columns, data_types)
+        
         # Analyze data if no chart type specified
         if not chart_type:
-            analysis = self.analyze_data(data, columns, data_types)
+            analysis = self.analyze_data(data, columns, data_types, column_classes)
             chart_type = analysis["recommended_chart"]
         
         try:
             if chart_type in self.chart_types:
                 chart_func = self.chart_types[chart_type]
-                fig = chart_func(data, columns, data_types, title)
+                fig = chart_func(data, columns, column_classes, title)
                 
                 return {
                     "success": True,
                     "chart_type": chart_type,
-                    "chart_data": fig.to_json(),
+                    # orjson encodes the figure's arrays in C rather than via stdlib json
+                    "chart_data": fig.to_json(engine="orjson"),
                     "title": title
                 }
             else:
                 return {"error": f"Unsupported chart type: {chart_type}"}
                 
         except Exception as e:
-            logger.error(f"Chart generation failed: {e}")
+            logger.error("Chart generation failed: %s", e)
             return {"error": f"Failed to generate chart: {str(e)}"}
     
-    def _create_bar_chart(self, data: List[Dict], columns: List[str], data_types: Dict[str, str], title: str) -> go.Figure:
+    def _create_bar_chart(self, data: List[Dict], columns: List[str], column_classes: ColumnClasses, title: str) -> "go.Figure":
         """Create a bar chart"""
-        df = pd.DataFrame(data)
+        import pandas as pd
+        import plotly.express as px
         
         # Find categorical and numeric columns
-        categorical_col = None
-        numeric_col = None
-        
-        for col in columns:
-            if col in data_types:
-                dtype = data_types[col].lower()
-                if 'int' in dtype or 'float' in dtype or 'numeric' in dtype:
-                    numeric_col = col
-                else:
-                    categorical_col = col
+        numeric_col = column_classes.numeric[-1] if column_classes.numeric else None
+        non_numeric = column_classes.categorical or column_classes.datetime
+        categorical_col = non_numeric[-1] if non_numeric else None
         
+        totals = None
         if categorical_col and numeric_col:
             # Group by categorical column and sum numeric column
-            grouped = df.groupby(categorical_col)[numeric_col].sum().reset_index()
-            fig = px.bar(grouped, x=categorical_col, y=numeric_col, title=title)
+            df = pd.DataFrame(_project(data, categorical_col, numeric_col))
+            # Category codes make the groupby hash ints instead of Python strings;
+            # sort=False keeps the categories in the order the query returned them
+            df[categorical_col] = df[categorical_col].astype('category')
+            totals = df.groupby(categorical_col, observed=True, sort=False)[numeric_col].sum()
+        
+        # Totals are empty when every category is NULL; chart the first column instead
+        if totals is not None and not totals.empty:
+            fig = px.bar(x=totals.index.astype(object), y=totals.values, title=title,
+                         labels={"x": categorical_col, "y": numeric_col})
         else:
             # Simple bar chart of first column
             first_col = columns[0]
-            value_counts = df[first_col].value_counts().reset_index()
+            value_counts = pd.Series(_project(data, first_col)[first_col], name=first_col).value_counts().reset_index()
             value_counts.columns = [first_col, 'count']
             fig = px.bar(value_counts, x=first_col, y='count', title=title)
         
         return fig
     
-    def _create_line_chart(self, data: List[Dict], columns: List[str], data_types: Dict[str, str], title: str) -> go.Figure:
+    def _create_line_chart(self, data: List[Dict], columns: List[str], column_classes: ColumnClasses, title: str) -> "go.Figure":
         """Create a line chart"""
-        df = pd.DataFrame(data)
+        import pandas as pd
+        import plotly.express as px
         
         # Find datetime and numeric columns
-        datetime_col = None
-        numeric_col = None
-        
-        for col in columns:
-            if col in data_types:
-                dtype = data_types[col].lower()
-                if 'date' in dtype or 'time' in dtype:
-                    datetime_col = col
-                elif 'int' in dtype or 'float' in dtype or 'numeric' in dtype:
-                    numeric_col = col
+        datetime_col = column_classes.datetime[-1] if column_classes.datetime else None
+        numeric_col = column_classes.numeric[-1] if column_classes.numeric else None
         
         if datetime_col and numeric_col:
             # Convert datetime column
+            df = pd.DataFrame(_project(data, datetime_col, numeric_col))
             df[datetime_col] = pd.to_datetime(df[datetime_col])
             df = df.sort_values(datetime_col)
             fig = px.line(df, x=datetime_col, y=numeric_col, title=title)
         else:
-            # Simple line chart of first numeric column
-            numeric_cols = [col for col in columns if col in data_types and 
-                          any(t in data_types[col].lower() for t in ['int', 'float', 'numeric'])]
-            if numeric_cols:
-                fig = px.line(df, y=numeric_cols[0], title=title)
-            else:
-                # Fallback to first column
-                fig = px.line(df, y=columns[0], title=title)
+            # Simple line chart of first numeric column, falling back to first column
+            y_col = column_classes.numeric[0] if column_classes.numeric else columns[0]
+            fig = px.line(pd.DataFrame(_project(data, y_col)), y=y_col, title=title)
         
         return fig
     
-    def _create_pie_chart(self, data: List[Dict], columns: List[str], data_types: Dict[str, str], title: str) -> go.Figure:
+    def _create_pie_chart(self, data: List[Dict], columns: List[str], column_classes: ColumnClasses, title: str) -> "go.Figure":
         """Create a pie chart"""
-        df = pd.DataFrame(data)
+        import pandas as pd
+        import plotly.express as px
         
         # Use first categorical column
-        categorical_col = None
-        for col in columns:
-            if col in data_types:
-                dtype = data_types[col].lower()
-                if not ('int' in dtype or 'float' in dtype or 'numeric' in dtype or 'date' in dtype or 'time' in dtype):
-                    categorical_col = col
-                    break
-        
-        if not categorical_col:
-            categorical_col = columns[0]
-        
-        # Count values
-        value_counts = df[categorical_col].value_counts().reset_index()
-        value_counts.columns = ['labels', 'values']
-        
-        fig = px.pie(value_counts, values='values', names='labels', title=title)
+        categorical_col = column_classes.categorical[0] if column_classes.categorical else columns[0]
+        numeric_col = column_classes.numeric[-1] if column_classes.numeric else None
+        
+        if numeric_col:
+            # Slice sizes are each category's share of the numeric total
+            df = pd.DataFrame(_project(data, categorical_col, numeric_col))
+            totals = df.groupby(categorical_col, sort=False)[numeric_col].sum()
+            fig = px.pie(names=totals.index.astype(object), values=totals.values, title=title)
+        else:
+            # Count values
+            value_counts = pd.Series(_project(data, categorical_col)[categorical_col], name=categorical_col).value_counts().reset_index()
+            value_counts.columns = ['labels', 'values']
+            fig = px.pie(value_counts, values='values', names='labels', title=title)
         return fig
     
-    def _create_scatter_chart(self, data: List[Dict], columns: List[str], data_types: Dict[str, str], title: str) -> go.Figure:
+    def _create_scatter_chart(self, data: List[Dict], columns: List[str], column_classes: ColumnClasses, title: str) -> "go.Figure":
         """Create a scatter plot"""
-        df = pd.DataFrame(data)
+        import pandas as pd
+        import plotly.express as px
         
         # Find numeric columns
-        numeric_cols = []
-        for col in columns:
-            if col in data_types:
-                dtype = data_types[col].lower()
-                if 'int' in dtype or 'float' in dtype or 'numeric' in dtype:
-                    numeric_cols.append(col)
+        numeric_cols = column_classes.numeric
         
         if len(numeric_cols) >= 2:
-            fig = px.scatter(df, x=numeric_cols[0], y=numeric_cols[1], title=title)
+            x_col, y_col = numeric_cols[0], numeric_cols[1]
         else:
             # Use first two columns
-            fig = px.scatter(df, x=columns[0], y=columns[1], title=title)
+            x_col, y_col = columns[0], columns[1]
         
+        fig = px.scatter(pd.DataFrame(_project(data, x_col, y_col)), x=x_col, y=y_col, title=title)
         return fig
     
-    def _create_table_chart(self, data: List[Dict], columns: List[str], data_types: Dict[str, str], title: str) -> go.Figure:
+    def _create_table_chart(self, data: List[Dict], columns: List[str], column_classes: ColumnClasses, title: str) -> "go.Figure":
         """Create a table visualization"""
-        df = pd.DataFrame(data)
+        import plotly.graph_objects as go
+        
+        # go.Table takes column-major lists directly; no DataFrame needed. Pull
+        # each row's cells with one itemgetter call and transpose them with zip
+        if len(columns) == 1:
+            cell_values = [[row[columns[0]] for row in data]]
+        elif columns:
+            cell_values = [list(values) for values in zip(*map(itemgetter(*columns), data))]
+        else:
+            cell_values = []
         
         fig = go.Figure(data=[go.Table(
             header=dict(values=columns,
                        fill_color='paleturquoise',
                        align='left'),
-            cells=dict(values=[df[col].tolist() for col in columns],
+            cells=dict(values=cell_values,
                       fill_color='lavender',
                       align='left'))
         ])
@@ -23,10 +23,11 @@ const ResultsDisplay = ({ queryResult }) => {
     sql_explanation, 
     query_results, 
     visualization,
-    visualization_suggestion 
+    visualization_suggestion,
+    additional_results
   } = queryResult;
 
-  const renderVisualization = () => {
+  const renderVisualization = (visualization) => {
     if (!visualization || !visualization.success) {
       return (
         <div className="error-state">
@@ -67,7 +68,7 @@ const ResultsDisplay = ({ queryResult }) => {
     }
   };
 
-  const renderDataTable = () => {
+  const renderDataTable = (query_results) => {
     if (!query_results || !query_results.data || query_results.data.length === 0) {
       return (
         <div className="empty-state">
@@ -112,7 +113,7 @@ const ResultsDisplay = ({ queryResult }) => {
     );
   };
 
-  const renderSQLDetails = () => {
+  const renderSQLDetails = (sql_query, sql_explanation, visualization_suggestion) => {
     return (
       <div className="sql-details">
         <div className="sql-section">
@@ -170,10 +171,32 @@ const ResultsDisplay = ({ queryResult }) => {
         </div>
 
         <div className="tab-content">
-          {activeTab === 'visualization' && renderVisualization()}
-          {activeTab === 'data' && renderDataTable()}
-          {activeTab === 'sql' && renderSQLDetails()}
+          {activeTab === 'visualization' && renderVisualization(visualization)}
+          {activeTab === 'data' && renderDataTable(query_results)}
+          {activeTab === 'sql' && renderSQLDetails(sql_query, sql_explanation, visualization_suggestion)}
         </div>
+
+        {additional_results && additional_results.length > 0 && (
+          <div className="additional-results">
+            {additional_results.map((result, index) => (
+              <div key={index} className="additional-result">
+                <h3>{result.sql_explanation || `Additional result ${index + 1}`}</h3>
+                {result.error ? (
+                  <div className="error-state">
+                    <h4>Query Error</h4>
+                    <p>{result.error}</p>
+                  </div>
+                ) : (
+                  <>
+                    {activeTab === 'visualization' && renderVisualization(result.visualization)}
+                    {activeTab === 'data' && renderDataTable(result.query_results)}
+                  </>
+                )}
+                {activeTab === 'sql' && renderSQLDetails(result.sql_query, result.sql_explanation)}
+              </div>
+            ))}
+          </div>
+        )}
       </div>
 
       <style jsx>{`
@@ -336,6 +359,18 @@ const ResultsDisplay = ({ queryResult }) => {
           color: #2c3e50;
         }
 
+        .additional-result {
+          margin-top: 2rem;
+          padding-top: 1.5rem;
+          border-top: 1px solid #e1e5e9;
+        }
+
+        .additional-result h3 {
+          margin: 0 0 1rem 0;
+          color: #2c3e50;
+          font-size: 1.2rem;
+        }
+
         .sql-explanation {
           background: #e8f4fd;
           border: 1px solid #bee5eb;
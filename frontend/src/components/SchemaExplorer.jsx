@@ -60,7 +60,10 @@ const SchemaExplorer = ({ isConnected }) => {
       if (response.data.success) {
         setSampleData(prev => ({
           ...prev,
-          [tableName]: response.data.sample_data
+          [tableName]: {
+            columns: response.data.columns,
+            rows: response.data.rows
+          }
         }));
       }
     } catch (err) {
@@ -226,15 +229,15 @@ const SchemaExplorer = ({ isConnected }) => {
                           <table>
                             <thead>
                               <tr>
-                                {Object.keys(sampleData[tableName][0] || {}).map(col => (
+                                {sampleData[tableName].columns.map(col => (
                                   <th key={col}>{col}</th>
                                 ))}
                               </tr>
                             </thead>
                             <tbody>
-                              {sampleData[tableName].map((row, index) => (
+                              {sampleData[tableName].rows.map((row, index) => (
                                 <tr key={index}>
-                                  {Object.values(row).map((value, colIndex) => (
+                                  {row.map((value, colIndex) => (
                                     <td key={colIndex}>
                                       {value !== null ? String(value) : <span className="null-value">null</span>}
                                     </td>
@@ -3,9 +3,11 @@
 Demo script to test the Natural Language Database Query System
 """
 
+import importlib.util
 import os
 import sys
 import subprocess
+import threading
 import time
 import requests
 from pathlib import Path
@@ -18,17 +20,13 @@ def check_dependencies():
     """Check if required dependencies are installed"""
     print("🔍 Checking dependencies...")
     
-    # Check Python packages
-    try:
-        import fastapi
-        import openai
-        import psycopg2
-        import plotly
-        print("✅ Python dependencies are installed")
-    except ImportError as e:
-        print(f"❌ Missing Python dependency: {e}")
+    # Check Python packages (find_spec locates them without importing them)
+    missing = [name for name in ("fastapi", "openai", "psycopg2", "plotly") if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"❌ Missing Python dependency: {', '.join(missing)}")
         print("Run: pip install -r requirements.txt")
         return False
+    print("✅ Python dependencies are installed")
     
     # Check Node.js and npm
     try:
@@ -53,6 +51,36 @@ def check_environment():
     print("✅ Environment variables are set")
     return True
 
+def watch_output(process, ready_marker):
+    """Drain a server's output in the background, returning an event set once ready_marker is printed"""
+    ready = threading.Event()
+    
+    def drain(stream):
+        for line in iter(stream.readline, b''):
+            if ready_marker in line:
+                ready.set()
+        stream.close()
+    
+    for stream in (process.stdout, process.stderr):
+        threading.Thread(target=drain, args=(stream,), daemon=True).start()
+    return ready
+
+def wait_until_ready(process, url, ready, timeout=30):
+    """Poll url on an exponential backoff (50ms doubling to 1s), checking at once when ready is set"""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        # Wakes early when the server announces it is listening
+        if ready.wait(min(delay, max(deadline - time.monotonic(), 0))):
+            ready.clear()
+        delay = min(delay * 2, 1.0)
+    return False
+
 def start_backend():
     """Start the FastAPI backend"""
     print("🚀 Starting backend server...")
@@ -65,15 +93,11 @@ def start_backend():
         sys.executable, "main.py"
     ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     
-    # Wait for backend to start
-    for i in range(30):  # Wait up to 30 seconds
-        try:
-            response = requests.get("http://localhost:8000/api/health", timeout=1)
-            if response.status_code == 200:
-                print("✅ Backend server is running on http://localhost:8000")
-                return process
-        except requests.exceptions.RequestException:
-            time.sleep(1)
+    # Wait for backend to start (up to 30 seconds)
+    ready = watch_output(process, b"Uvicorn running on")
+    if wait_until_ready(process, "http://localhost:8000/api/health", ready):
+        print("✅ Backend server is running on http://localhost:8000")
+        return process
     
     print("❌ Backend server failed to start")
     process.terminate()
@@ -91,15 +115,11 @@ def start_frontend():
         "npm", "run", "dev"
     ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     
-    # Wait for frontend to start
-    for i in range(30):  # Wait up to 30 seconds
-        try:
-            response = requests.get("http://localhost:5173", timeout=1)
-            if response.status_code == 200:
-                print("✅ Frontend server is running on http://localhost:5173")
-                return process
-        except requests.exceptions.RequestException:
-            time.sleep(1)
+    # Wait for frontend to start (up to 30 seconds)
+    ready = watch_output(process, b"ready in")
+    if wait_until_ready(process, "http://localhost:5173", ready):
+        print("✅ Frontend server is running on http://localhost:5173")
+        return process
     
     print("❌ Frontend server failed to start")
     process.terminate()
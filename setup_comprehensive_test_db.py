@@ -5,117 +5,176 @@ This allows testing without requiring PostgreSQL
 """
 
 import sqlite3
-import pandas as pd
-from datetime import datetime, timedelta
-import random
+import numpy as np
 import os
+from contextlib import closing
+from datetime import datetime, date
+from sqlite_loader import connect, insert_rows
+
+def days_ago(rng, low, high, size):
+    """Random 'YYYY-MM-DD' dates between low and high days before today"""
+    # datetime64('today') is the UTC date; anchor on the local date instead
+    today = np.datetime64(datetime.now().date())
+    offsets = rng.integers(low, high + 1, size).astype('timedelta64[D]')
+    return (today - offsets).astype(str).tolist()
+
+# Product base names, one tuple per category; category id N is PRODUCT_NAMES[N - 1]
+PRODUCT_NAMES = (
+    ('Laptop', 'Smartphone', 'Tablet', 'Headphones', 'Camera', 'Monitor', 'Keyboard', 'Mouse', 'Speaker', 'Charger'),
+    ('T-Shirt', 'Jeans', 'Dress', 'Jacket', 'Shoes', 'Hat', 'Socks', 'Belt', 'Scarf', 'Gloves'),
+    ('Programming Book', 'Fiction Novel', 'Textbook', 'Biography', 'Cookbook', 'Travel Guide', 'Dictionary', 'Magazine', 'Comic', 'Manual'),
+    ('Garden Tools', 'Furniture', 'Lighting', 'Paint', 'Hardware', 'Plants', 'Seeds', 'Soil', 'Pots', 'Decor'),
+    ('Running Shoes', 'Basketball', 'Tennis Racket', 'Yoga Mat', 'Dumbbells', 'Bike', 'Helmet', 'Water Bottle', 'Gym Bag', 'Stopwatch'),
+    ('Shampoo', 'Lotion', 'Makeup', 'Perfume', 'Soap', 'Cream', 'Serum', 'Mask', 'Brush', 'Mirror'),
+    ('Tire', 'Oil Filter', 'Brake Pad', 'Battery', 'Headlight', 'Mirror', 'Floor Mat', 'Air Freshener', 'Tool Kit', 'Jump Starter'),
+    ('Action Figure', 'Board Game', 'Puzzle', 'Doll', 'Building Blocks', 'Art Set', 'Remote Car', 'Robot', 'Stuffed Animal', 'Card Game'),
+    ('Coffee', 'Tea', 'Snacks', 'Candy', 'Juice', 'Water', 'Cereal', 'Pasta', 'Sauce', 'Spices'),
+    ('Vitamins', 'Supplements', 'Thermometer', 'Bandage', 'Medicine', 'Scale', 'Blood Pressure Monitor', 'First Aid Kit', 'Pill Organizer', 'Massage Oil')
+)
+
+# Values for the categorical columns, sampled with rng.choice
+REGIONS = ('North', 'South', 'East', 'West', 'Central')
+CITIES = ('New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose')
+COUNTRIES = ('USA', 'Canada', 'Mexico')
+CUSTOMER_TYPES = ('Individual', 'Business', 'VIP')
+DEPARTMENTS = ('Sales', 'Marketing', 'IT', 'HR', 'Finance', 'Operations', 'Customer Service')
+POSITIONS = ('Manager', 'Senior', 'Junior', 'Specialist', 'Analyst', 'Coordinator', 'Director')
+PAYMENT_METHODS = ('Credit Card', 'Debit Card', 'Cash', 'PayPal', 'Bank Transfer')
+
+# Schema, run as one script so every statement is parsed and executed in a single call
+DDL = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    category_id INTEGER,
+    price DECIMAL(10,2),
+    cost DECIMAL(10,2),
+    sku TEXT UNIQUE,
+    description TEXT,
+    in_stock BOOLEAN DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (category_id) REFERENCES categories (id)
+);
+
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE,
+    phone TEXT,
+    region TEXT,
+    city TEXT,
+    country TEXT,
+    customer_type TEXT,
+    registration_date DATE,
+    total_spent DECIMAL(10,2) DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    department TEXT,
+    position TEXT,
+    hire_date DATE,
+    salary DECIMAL(10,2),
+    manager_id INTEGER,
+    FOREIGN KEY (manager_id) REFERENCES employees (id)
+);
+
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER,
+    customer_id INTEGER,
+    employee_id INTEGER,
+    amount DECIMAL(10,2),
+    quantity INTEGER,
+    discount_percent DECIMAL(5,2) DEFAULT 0,
+    sale_date DATE,
+    payment_method TEXT,
+    region TEXT,
+    FOREIGN KEY (product_id) REFERENCES products (id),
+    FOREIGN KEY (customer_id) REFERENCES customers (id),
+    FOREIGN KEY (employee_id) REFERENCES employees (id)
+);
+
+CREATE TABLE IF NOT EXISTS inventory (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER,
+    quantity INTEGER,
+    reorder_level INTEGER,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (product_id) REFERENCES products (id)
+);
+
+CREATE TABLE IF NOT EXISTS marketing_campaigns (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    campaign_type TEXT,
+    start_date DATE,
+    end_date DATE,
+    budget DECIMAL(10,2),
+    spent DECIMAL(10,2) DEFAULT 0,
+    status TEXT
+);
+"""
+
+# Bump whenever the schema or the generated data changes, so existing databases are rebuilt
+SEED_VERSION = 1
+NUM_SALES = 2000
+
+def build_stamp():
+    """PRAGMA user_version value for a database built today by this generator version.
+    
+    Dates are generated relative to today, so a database from an earlier day is stale too.
+    """
+    return SEED_VERSION * 1_000_000 + date.today().toordinal()
+
+def database_is_current(path):
+    """Whether path holds a complete database from this generator version, built today"""
+    if not os.path.exists(path):
+        return False
+    try:
+        with closing(sqlite3.connect(path)) as conn:
+            user_version = conn.execute('PRAGMA user_version').fetchone()[0]
+            sales_count = conn.execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+    except sqlite3.Error:
+        return False
+    return user_version == build_stamp() and sales_count == NUM_SALES
 
 def create_comprehensive_test_database():
     """Create a comprehensive test database with realistic sample data"""
     
+    # The RNG is seeded, so an up-to-date database already holds exactly what
+    # a rebuild would produce
+    if database_is_current('test_database.db'):
+        print("✅ Comprehensive test database is already up to date")
+        print("   sqlite:///test_database.db")
+        return
+    
     # Remove existing database if it exists
     if os.path.exists('test_database.db'):
         os.remove('test_database.db')
     
     # Connect to SQLite database (creates if doesn't exist)
-    conn = sqlite3.connect('test_database.db')
+    conn = connect('test_database.db')
     cursor = conn.cursor()
     
-    # Create tables with more comprehensive structure
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            category_id INTEGER,
-            price DECIMAL(10,2),
-            cost DECIMAL(10,2),
-            sku TEXT UNIQUE,
-            description TEXT,
-            in_stock BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (category_id) REFERENCES categories (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS customers (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE,
-            phone TEXT,
-            region TEXT,
-            city TEXT,
-            country TEXT,
-            customer_type TEXT,
-            registration_date DATE,
-            total_spent DECIMAL(10,2) DEFAULT 0
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS employees (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            email TEXT,
-            department TEXT,
-            position TEXT,
-            hire_date DATE,
-            salary DECIMAL(10,2),
-            manager_id INTEGER,
-            FOREIGN KEY (manager_id) REFERENCES employees (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sales (
-            id INTEGER PRIMARY KEY,
-            product_id INTEGER,
-            customer_id INTEGER,
-            employee_id INTEGER,
-            amount DECIMAL(10,2),
-            quantity INTEGER,
-            discount_percent DECIMAL(5,2) DEFAULT 0,
-            sale_date DATE,
-            payment_method TEXT,
-            region TEXT,
-            FOREIGN KEY (product_id) REFERENCES products (id),
-            FOREIGN KEY (customer_id) REFERENCES customers (id),
-            FOREIGN KEY (employee_id) REFERENCES employees (id)
-        )
-    ''')
+    # The database is rebuilt from scratch, so favour load speed over durability
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA cache_size=-64000')
+    # Generated foreign keys only reference ids loaded alongside them
+    cursor.execute('PRAGMA foreign_keys=OFF')
     
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS inventory (
-            id INTEGER PRIMARY KEY,
-            product_id INTEGER,
-            quantity INTEGER,
-            reorder_level INTEGER,
-            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (product_id) REFERENCES products (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS marketing_campaigns (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            campaign_type TEXT,
-            start_date DATE,
-            end_date DATE,
-            budget DECIMAL(10,2),
-            spent DECIMAL(10,2) DEFAULT 0,
-            status TEXT
-        )
-    ''')
+    # Create tables with more comprehensive structure in a single script
+    conn.executescript(DDL)
     
     # Insert comprehensive data
     
@@ -133,115 +192,102 @@ def create_comprehensive_test_database():
         (10, 'Health', 'Health and wellness products', '2024-01-01 00:00:00')
     ]
     
+    # All random columns are drawn as whole NumPy arrays rather than value by value
+    rng = np.random.default_rng(0)
+    
     # Products (100 products)
-    products_data = []
-    for i in range(1, 101):
-        category_id = random.randint(1, 10)
-        base_price = random.uniform(10, 1000)
-        cost = base_price * random.uniform(0.4, 0.7)
-        
-        product_names = {
-            1: ['Laptop', 'Smartphone', 'Tablet', 'Headphones', 'Camera', 'Monitor', 'Keyboard', 'Mouse', 'Speaker', 'Charger'],
-            2: ['T-Shirt', 'Jeans', 'Dress', 'Jacket', 'Shoes', 'Hat', 'Socks', 'Belt', 'Scarf', 'Gloves'],
-            3: ['Programming Book', 'Fiction Novel', 'Textbook', 'Biography', 'Cookbook', 'Travel Guide', 'Dictionary', 'Magazine', 'Comic', 'Manual'],
-            4: ['Garden Tools', 'Furniture', 'Lighting', 'Paint', 'Hardware', 'Plants', 'Seeds', 'Soil', 'Pots', 'Decor'],
-            5: ['Running Shoes', 'Basketball', 'Tennis Racket', 'Yoga Mat', 'Dumbbells', 'Bike', 'Helmet', 'Water Bottle', 'Gym Bag', 'Stopwatch'],
-            6: ['Shampoo', 'Lotion', 'Makeup', 'Perfume', 'Soap', 'Cream', 'Serum', 'Mask', 'Brush', 'Mirror'],
-            7: ['Tire', 'Oil Filter', 'Brake Pad', 'Battery', 'Headlight', 'Mirror', 'Floor Mat', 'Air Freshener', 'Tool Kit', 'Jump Starter'],
-            8: ['Action Figure', 'Board Game', 'Puzzle', 'Doll', 'Building Blocks', 'Art Set', 'Remote Car', 'Robot', 'Stuffed Animal', 'Card Game'],
-            9: ['Coffee', 'Tea', 'Snacks', 'Candy', 'Juice', 'Water', 'Cereal', 'Pasta', 'Sauce', 'Spices'],
-            10: ['Vitamins', 'Supplements', 'Thermometer', 'Bandage', 'Medicine', 'Scale', 'Blood Pressure Monitor', 'First Aid Kit', 'Pill Organizer', 'Massage Oil']
-        }
-        
-        name = random.choice(product_names[category_id]) + f" {i}"
-        sku = f"SKU-{category_id:02d}-{i:03d}"
-        description = f"High-quality {name.lower()} for everyday use"
-        
-        products_data.append((
-            i, name, category_id, round(base_price, 2), round(cost, 2), 
-            sku, description, random.choice([True, True, True, False]),  # Mostly in stock
-            '2024-01-01 00:00:00'  # created_at
-        ))
+    num_products = 100
+    product_categories = rng.integers(1, 11, num_products)
+    product_name_choices = rng.integers(0, 10, num_products)
+    base_prices = rng.uniform(10, 1000, num_products)
+    costs = base_prices * rng.uniform(0.4, 0.7, num_products)
+    in_stock = rng.random(num_products) < 0.75  # Mostly in stock
+    
+    # Each text column is built in its own comprehension over the sampled arrays
+    product_ids = range(1, num_products + 1)
+    category_ids = product_categories.tolist()
+    names = [f"{PRODUCT_NAMES[category_id - 1][name_choice]} {i}"
+             for i, category_id, name_choice in zip(product_ids, category_ids, product_name_choices.tolist())]
+    skus = [f"SKU-{category_id:02d}-{i:03d}" for i, category_id in zip(product_ids, category_ids)]
+    descriptions = [f"High-quality {name} for everyday use" for name in map(str.lower, names)]
+    
+    products_data = list(zip(
+        product_ids, names, category_ids,
+        np.round(base_prices, 2).tolist(), np.round(costs, 2).tolist(),
+        skus, descriptions, in_stock.tolist(),
+        ['2024-01-01 00:00:00'] * num_products  # created_at
+    ))
     
     # Customers (200 customers)
-    customers_data = []
-    regions = ['North', 'South', 'East', 'West', 'Central']
-    cities = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'San Diego', 'Dallas', 'San Jose']
-    countries = ['USA', 'Canada', 'Mexico']
-    customer_types = ['Individual', 'Business', 'VIP']
+    num_customers = 200
+    customer_ids = range(1, num_customers + 1)
+    phones = [f"555-{a}-{b}" for a, b in zip(rng.integers(100, 1000, num_customers).tolist(),
+                                            rng.integers(1000, 10000, num_customers).tolist())]
     
-    for i in range(1, 201):
-        name = f"Customer {i}"
-        email = f"customer{i}@email.com"
-        phone = f"555-{random.randint(100, 999)}-{random.randint(1000, 9999)}"
-        region = random.choice(regions)
-        city = random.choice(cities)
-        country = random.choice(countries)
-        customer_type = random.choice(customer_types)
-        
-        # Registration date in the past 2 years
-        reg_date = datetime.now() - timedelta(days=random.randint(1, 730))
-        
-        customers_data.append((
-            i, name, email, phone, region, city, country, 
-            customer_type, reg_date.strftime('%Y-%m-%d'), 0
-        ))
+    # total_spent is filled in once the sales are generated
+    customer_rows = list(zip(
+        customer_ids,
+        [f"Customer {i}" for i in customer_ids],
+        [f"customer{i}@email.com" for i in customer_ids],
+        phones,
+        rng.choice(REGIONS, num_customers).tolist(),
+        rng.choice(CITIES, num_customers).tolist(),
+        rng.choice(COUNTRIES, num_customers).tolist(),
+        rng.choice(CUSTOMER_TYPES, num_customers).tolist(),
+        days_ago(rng, 1, 730, num_customers)  # Registration date in the past 2 years
+    ))
     
     # Employees (50 employees)
-    employees_data = []
-    departments = ['Sales', 'Marketing', 'IT', 'HR', 'Finance', 'Operations', 'Customer Service']
-    positions = ['Manager', 'Senior', 'Junior', 'Specialist', 'Analyst', 'Coordinator', 'Director']
+    num_employees = 50
+    employee_ids = range(1, num_employees + 1)
+    manager_ids = rng.integers(1, 11, num_employees).tolist()
     
-    for i in range(1, 51):
-        name = f"Employee {i}"
-        email = f"employee{i}@company.com"
-        department = random.choice(departments)
-        position = random.choice(positions)
-        
-        # Hire date in the past 5 years
-        hire_date = datetime.now() - timedelta(days=random.randint(1, 1825))
-        
-        salary = random.uniform(30000, 150000)
-        manager_id = random.randint(1, 10) if i > 10 else None
-        
-        employees_data.append((
-            i, name, email, department, position, 
-            hire_date.strftime('%Y-%m-%d'), round(salary, 2), manager_id
-        ))
+    employees_data = list(zip(
+        employee_ids,
+        [f"Employee {i}" for i in employee_ids],
+        [f"employee{i}@company.com" for i in employee_ids],
+        rng.choice(DEPARTMENTS, num_employees).tolist(),
+        rng.choice(POSITIONS, num_employees).tolist(),
+        days_ago(rng, 1, 1825, num_employees),  # Hire date in the past 5 years
+        np.round(rng.uniform(30000, 150000, num_employees), 2).tolist(),
+        [manager_id if i > 10 else None for i, manager_id in zip(employee_ids, manager_ids)]
+    ))
     
     # Sales (2000 sales records)
-    sales_data = []
-    payment_methods = ['Credit Card', 'Debit Card', 'Cash', 'PayPal', 'Bank Transfer']
+    num_sales = NUM_SALES
+    quantities = rng.integers(1, 11, num_sales)
+    sale_prices = rng.uniform(10, 1000, num_sales)  # Product price (simplified)
+    discounts = rng.uniform(0, 0.3, num_sales)  # 0-30% discount
+    amounts = np.round(sale_prices * quantities * (1 - discounts), 2)
+    product_ids = rng.integers(1, 101, num_sales)
+    sale_customer_ids = rng.integers(1, num_customers + 1, num_sales)
+    
+    sales_data = list(zip(
+        range(1, num_sales + 1),
+        product_ids.tolist(),
+        sale_customer_ids.tolist(),
+        rng.integers(1, 51, num_sales).tolist(),
+        amounts.tolist(),
+        quantities.tolist(),
+        np.round(discounts * 100, 2).tolist(),
+        days_ago(rng, 1, 730, num_sales),  # Sale date in the past 2 years
+        rng.choice(PAYMENT_METHODS, num_sales).tolist(),
+        rng.choice(REGIONS, num_sales).tolist()
+    ))
     
-    for i in range(1, 2001):
-        product_id = random.randint(1, 100)
-        customer_id = random.randint(1, 200)
-        employee_id = random.randint(1, 50)
-        quantity = random.randint(1, 10)
-        
-        # Get product price (simplified)
-        base_price = random.uniform(10, 1000)
-        discount = random.uniform(0, 0.3)  # 0-30% discount
-        amount = base_price * quantity * (1 - discount)
-        
-        # Sale date in the past 2 years
-        sale_date = datetime.now() - timedelta(days=random.randint(1, 730))
-        
-        payment_method = random.choice(payment_methods)
-        region = random.choice(regions)
-        
-        sales_data.append((
-            i, product_id, customer_id, employee_id, round(amount, 2), 
-            quantity, round(discount * 100, 2), sale_date.strftime('%Y-%m-%d'),
-            payment_method, region
-        ))
+    # Customer total spent, summed from the generated sales instead of a later UPDATE
+    customer_totals = np.round(np.bincount(sale_customer_ids, weights=amounts, minlength=num_customers + 1)[1:], 2)
+    customers_data = [row + (total,) for row, total in zip(customer_rows, customer_totals.tolist())]
     
     # Inventory
-    inventory_data = []
-    for i in range(1, 101):
-        quantity = random.randint(0, 500)
-        reorder_level = random.randint(10, 100)
-        inventory_data.append((i, i, quantity, reorder_level, '2024-01-01 00:00:00'))
+    num_inventory = 100
+    inventory_data = list(zip(
+        range(1, num_inventory + 1),
+        range(1, num_inventory + 1),
+        rng.integers(0, 501, num_inventory).tolist(),
+        rng.integers(10, 101, num_inventory).tolist(),
+        ['2024-01-01 00:00:00'] * num_inventory
+    ))
     
     # Marketing Campaigns
     campaigns_data = [
@@ -257,27 +303,28 @@ def create_comprehensive_test_database():
         (10, 'Automotive Expo', 'Trade Show', '2024-10-01', '2024-10-07', 150000, 145000, 'Completed')
     ]
     
-    # Insert all data
-    cursor.executemany('INSERT INTO categories VALUES (?, ?, ?, ?)', categories_data)
-    cursor.executemany('INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', products_data)
-    cursor.executemany('INSERT INTO customers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', customers_data)
-    cursor.executemany('INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?, ?, ?)', employees_data)
-    cursor.executemany('INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', sales_data)
-    cursor.executemany('INSERT INTO inventory VALUES (?, ?, ?, ?, ?)', inventory_data)
-    cursor.executemany('INSERT INTO marketing_campaigns VALUES (?, ?, ?, ?, ?, ?, ?, ?)', campaigns_data)
+    # Insert all data in one transaction
+    cursor.execute('BEGIN')
+    insert_rows(cursor, 'categories', categories_data)
+    insert_rows(cursor, 'products', products_data)
+    insert_rows(cursor, 'customers', customers_data)
+    insert_rows(cursor, 'employees', employees_data)
+    insert_rows(cursor, 'sales', sales_data)
+    insert_rows(cursor, 'inventory', inventory_data)
+    insert_rows(cursor, 'marketing_campaigns', campaigns_data)
+    
+    # Index the sales foreign keys only now that the rows are loaded, so the
+    # inserts above did not have to maintain them row by row; they serve the
+    # joins the demo queries make
+    cursor.execute('CREATE INDEX idx_sales_customer_id ON sales(customer_id)')
+    cursor.execute('CREATE INDEX idx_sales_product_id ON sales(product_id)')
+    cursor.execute('CREATE INDEX idx_sales_employee_id ON sales(employee_id)')
     
-    # Update customer total spent
-    cursor.execute('''
-        UPDATE customers 
-        SET total_spent = (
-            SELECT COALESCE(SUM(amount), 0) 
-            FROM sales 
-            WHERE sales.customer_id = customers.id
-        )
-    ''')
+    # Stamp the database so the next run can skip an identical rebuild
+    cursor.execute(f'PRAGMA user_version = {build_stamp()}')
     
     # Commit and close
-    conn.commit()
+    cursor.execute('COMMIT')
     conn.close()
     
     print("✅ Comprehensive test database created successfully!")
@@ -4,57 +4,62 @@ Setup a test SQLite database for demonstration purposes
 This allows testing without requiring PostgreSQL
 """
 
-import sqlite3
-import pandas as pd
-from datetime import datetime, timedelta
-import random
+import numpy as np
+from datetime import datetime
+from sqlite_loader import connect, insert_rows
+
+# Basic test schema, dropping any previous build's tables first
+DDL = """
+DROP TABLE IF EXISTS sales;
+DROP TABLE IF EXISTS products;
+DROP TABLE IF EXISTS customers;
+DROP TABLE IF EXISTS categories;
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    category_id INTEGER,
+    price DECIMAL(10,2),
+    FOREIGN KEY (category_id) REFERENCES categories (id)
+);
+
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    region TEXT
+);
+
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER,
+    customer_id INTEGER,
+    amount DECIMAL(10,2),
+    quantity INTEGER,
+    sale_date DATE,
+    FOREIGN KEY (product_id) REFERENCES products (id),
+    FOREIGN KEY (customer_id) REFERENCES customers (id)
+);
+"""
 
 def create_test_database():
     """Create a test database with sample data"""
     
     # Connect to SQLite database (creates if doesn't exist)
-    conn = sqlite3.connect('test_database.db')
+    conn = connect('test_database.db')
     cursor = conn.cursor()
     
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            category_id INTEGER,
-            price DECIMAL(10,2),
-            FOREIGN KEY (category_id) REFERENCES categories (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS customers (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            email TEXT,
-            region TEXT
-        )
-    ''')
+    # Dropping products must not trip the comprehensive schema's inventory
+    # foreign key on builds that enforce foreign keys by default
+    cursor.execute('PRAGMA foreign_keys=OFF')
     
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sales (
-            id INTEGER PRIMARY KEY,
-            product_id INTEGER,
-            customer_id INTEGER,
-            amount DECIMAL(10,2),
-            quantity INTEGER,
-            sale_date DATE,
-            FOREIGN KEY (product_id) REFERENCES products (id),
-            FOREIGN KEY (customer_id) REFERENCES customers (id)
-        )
-    ''')
+    # Start from empty tables so rows can be inserted without conflict checks
+    conn.executescript(DDL)
     
     # Insert sample data
     categories_data = [
@@ -89,35 +94,38 @@ def create_test_database():
         (8, 'Frank Miller', 'frank@email.com', 'West')
     ]
     
-    # Generate sales data for the past 6 months
-    sales_data = []
-    start_date = datetime.now() - timedelta(days=180)
+    # Generate sales data for the past 6 months, drawing each column as a NumPy array
+    rng = np.random.default_rng(0)
+    num_sales = 200
+    product_ids = rng.integers(1, 11, num_sales)
+    quantities = rng.integers(1, 6, num_sales)
+    
+    # Look up each sale's product price by product id
+    product_prices = np.array([price for _, _, _, price in products_data])
+    amounts = product_prices[product_ids - 1] * quantities
+    
+    # Random date within the past 6 months, counted from today's local date
+    today = np.datetime64(datetime.now().date())
+    sale_dates = today - 180 + rng.integers(0, 181, num_sales).astype('timedelta64[D]')
     
-    for i in range(1, 201):  # 200 sales records
-        product_id = random.randint(1, 10)
-        customer_id = random.randint(1, 8)
-        quantity = random.randint(1, 5)
-        
-        # Get product price
-        product_price = next((p[3] for p in products_data if p[0] == product_id), 50.00)
-        amount = product_price * quantity
-        
-        # Random date within the past 6 months
-        random_days = random.randint(0, 180)
-        sale_date = start_date + timedelta(days=random_days)
-        
-        sales_data.append((
-            i, product_id, customer_id, amount, quantity, sale_date.strftime('%Y-%m-%d')
-        ))
+    sales_data = list(zip(
+        range(1, num_sales + 1),
+        product_ids.tolist(),
+        rng.integers(1, 9, num_sales).tolist(),
+        amounts.tolist(),
+        quantities.tolist(),
+        sale_dates.astype(str).tolist()
+    ))
     
-    # Insert data
-    cursor.executemany('INSERT OR REPLACE INTO categories VALUES (?, ?)', categories_data)
-    cursor.executemany('INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?)', products_data)
-    cursor.executemany('INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?)', customers_data)
-    cursor.executemany('INSERT OR REPLACE INTO sales VALUES (?, ?, ?, ?, ?, ?)', sales_data)
+    # Insert data in one transaction
+    cursor.execute('BEGIN')
+    insert_rows(cursor, 'categories', categories_data)
+    insert_rows(cursor, 'products', products_data)
+    insert_rows(cursor, 'customers', customers_data)
+    insert_rows(cursor, 'sales', sales_data)
     
     # Commit and close
-    conn.commit()
+    cursor.execute('COMMIT')
     conn.close()
     
     print("✅ Test database created successfully!")
@@ -0,0 +1,40 @@
+"""
+Bulk-loading helpers shared by the test database setup scripts
+"""
+
+import sqlite3
+
+# SQLite's historical default cap on bound parameters per statement, used when
+# the connection can't report its own limit (Python < 3.11)
+SQLITE_MAX_VARIABLES = 999
+
+def connect(path):
+    """Open a SQLite database for loading.
+    
+    Transactions are managed explicitly (no implicit BEGIN), so a script can put
+    all of its inserts in a single commit and run DDL scripts outside one.
+    """
+    return sqlite3.connect(path, isolation_level=None)
+
+def max_variables(conn):
+    """The connection's cap on bound parameters per statement"""
+    if hasattr(conn, 'getlimit'):
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    return SQLITE_MAX_VARIABLES
+
+def insert_rows(cursor, table, rows):
+    """Insert rows with multi-row VALUES statements, as many rows per statement as the parameter cap allows.
+    
+    On current SQLite builds (cap 32766 or more) a table of a few thousand rows goes in
+    as a single prepared statement.
+    """
+    if not rows:
+        return
+    placeholders = '(' + ', '.join('?' * len(rows[0])) + ')'
+    chunk_size = max(1, max_variables(cursor.connection) // len(rows[0]))
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cursor.execute(
+            f"INSERT INTO {table} VALUES {', '.join([placeholders] * len(chunk))}",
+            [value for row in chunk for value in row]
+        )
@@ -3,158 +3,129 @@
 Test script to verify the system is working correctly
 """
 
+import sys
 import requests
 import json
-import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
-def test_backend():
-    """Test backend API endpoints"""
-    print("🧪 Testing Backend API...")
-    
-    base_url = "http://localhost:8000"
-    
-    # Test health endpoint
-    try:
-        response = requests.get(f"{base_url}/api/health")
-        if response.status_code == 200:
-            print("✅ Health endpoint working")
-        else:
-            print("❌ Health endpoint failed")
-            return False
-    except Exception as e:
-        print(f"❌ Backend not accessible: {e}")
-        return False
-    
-    # Test root endpoint
-    try:
-        response = requests.get(f"{base_url}/")
-        if response.status_code == 200:
-            print("✅ Root endpoint working")
-        else:
-            print("❌ Root endpoint failed")
-            return False
-    except Exception as e:
-        print(f"❌ Root endpoint failed: {e}")
-        return False
-    
-    return True
+# One keep-alive session for every probe; the pool covers the parallel probes
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
 
-def test_frontend():
-    """Test frontend accessibility"""
-    print("🧪 Testing Frontend...")
-    
-    try:
-        response = requests.get("http://localhost:5173")
-        if response.status_code == 200 and "root" in response.text and "main.jsx" in response.text:
-            print("✅ Frontend accessible and serving React app")
-            return True
-        else:
-            print("❌ Frontend not loading correctly")
-            return False
-    except Exception as e:
-        print(f"❌ Frontend not accessible: {e}")
-        return False
+BACKEND_URL = "http://localhost:8000"
+FRONTEND_URL = "http://localhost:5173"
 
-def test_database_connection():
-    """Test database connection with SQLite"""
-    print("🧪 Testing Database Connection...")
-    
+def check_status(response):
+    """Pass on HTTP 200"""
+    if response.status_code == 200:
+        return True, []
+    return False, [f"status {response.status_code}"]
+
+def check_react_app(response):
+    """Pass when the page is the React app's index.html"""
+    return response.status_code == 200 and "root" in response.text and "main.jsx" in response.text, []
+
+def check_success(details):
+    """Pass when the JSON response reports success, reporting details(data) on success"""
+    def check(response):
+        if response.status_code != 200:
+            return False, [f"status {response.status_code}"]
+        data = response.json()
+        if data.get("success"):
+            return True, details(data)
+        return False, [data.get("error")]
+    return check
+
+def connection_details(data):
+    return [f"📊 Found {len(data.get('schema', {}).get('tables', {}))} tables"]
+
+def query_details(data):
+    return [
+        f"📈 Generated SQL: {data.get('sql_query', 'N/A')[:100]}...",
+        f"📊 Results: {data.get('query_results', {}).get('row_count', 0)} rows"
+    ]
+
+# (test name, heading, [(check name, HTTP method, URL, JSON payload, check)]).
+# A test passes when all of its checks pass, stopping at the first failure
+TESTS = [
+    ("Backend API", "🧪 Testing Backend API...", [
+        ("Health endpoint", "GET", f"{BACKEND_URL}/api/health", None, check_status),
+        ("Root endpoint", "GET", f"{BACKEND_URL}/", None, check_status)
+    ]),
+    ("Frontend", "🧪 Testing Frontend...", [
+        ("Frontend React app", "GET", FRONTEND_URL, None, check_react_app)
+    ]),
+    ("Database Connection", "🧪 Testing Database Connection...", [
+        # No connection string - should use test database automatically
+        ("Database connection", "POST", f"{BACKEND_URL}/api/connect", {}, check_success(connection_details))
+    ]),
+    ("Natural Language Query", "🧪 Testing Natural Language Query...", [
+        ("Query processing", "POST", f"{BACKEND_URL}/api/query",
+         {"query": "Show me total sales by category"}, check_success(query_details))
+    ])
+]
+
+def run_probe(log, name, method, url, payload, check):
+    """Send one request, appending its report to log, and return whether its check passed"""
     try:
-        response = requests.post(
-            "http://localhost:8000/api/connect",
-            json={},  # No connection string - should use test database automatically
-            headers={"Content-Type": "application/json"}
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("success"):
-                print("✅ Database connection successful")
-                print(f"📊 Found {len(data.get('schema', {}).get('tables', {}))} tables")
-                return True
-            else:
-                print(f"❌ Database connection failed: {data.get('error')}")
-                return False
-        else:
-            print(f"❌ Database connection failed: {response.status_code}")
-            return False
+        response = SESSION.request(method, url, json=payload)
+        passed, details = check(response)
     except Exception as e:
-        print(f"❌ Database connection test failed: {e}")
+        log.append(f"❌ {name} failed: {e}")
         return False
-
-def test_query():
-    """Test a simple natural language query"""
-    print("🧪 Testing Natural Language Query...")
     
-    try:
-        response = requests.post(
-            "http://localhost:8000/api/query",
-            json={"query": "Show me total sales by category"},
-            headers={"Content-Type": "application/json"}
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("success"):
-                print("✅ Query processing successful")
-                print(f"📈 Generated SQL: {data.get('sql_query', 'N/A')[:100]}...")
-                print(f"📊 Results: {data.get('query_results', {}).get('row_count', 0)} rows")
-                return True
-            else:
-                print(f"❌ Query processing failed: {data.get('error')}")
-                return False
-        else:
-            print(f"❌ Query request failed: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Query test failed: {e}")
+    if not passed:
+        log.append(f"❌ {name} failed" + "".join(f": {detail}" for detail in details))
         return False
+    log.append(f"✅ {name} working")
+    log.extend(details)
+    return True
+
+def run_test(test_name, heading, probes):
+    """Run one test's probes, returning the result and its report lines"""
+    log = [f"\n🔍 {test_name} Test:", heading]
+    result = all(run_probe(log, *probe) for probe in probes)
+    return result, log
 
 def main():
     """Run all tests"""
-    print("🗣️  Talk to Your Data - System Test")
-    print("=" * 50)
-    
-    tests = [
-        ("Backend API", test_backend),
-        ("Frontend", test_frontend),
-        ("Database Connection", test_database_connection),
-        ("Natural Language Query", test_query)
-    ]
+    # Every line is collected here and written once at the end; parallel tests
+    # each keep their own log, so their reports never interleave
+    results_log = ["🗣️  Talk to Your Data - System Test", "=" * 50]
     
-    results = []
+    # The probes are independent, except that the query needs the database
+    # connection to be made first, so it runs after the others
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(run_test, *test) for test in TESTS[:-1]]
+        outcomes = [future.result() for future in futures]
+    outcomes.append(run_test(*TESTS[-1]))
     
-    for test_name, test_func in tests:
-        print(f"\n🔍 {test_name} Test:")
-        try:
-            result = test_func()
-            results.append((test_name, result))
-        except Exception as e:
-            print(f"❌ {test_name} test crashed: {e}")
-            results.append((test_name, False))
-        
-        time.sleep(1)  # Brief pause between tests
+    # Report in the order the tests are listed
+    for _, test_log in outcomes:
+        results_log.extend(test_log)
     
-    print("\n" + "=" * 50)
-    print("📊 Test Results Summary:")
+    results_log.append("\n" + "=" * 50)
+    results_log.append("📊 Test Results Summary:")
     
     all_passed = True
-    for test_name, result in results:
+    for (test_name, _, _), (result, _) in zip(TESTS, outcomes):
         status = "✅ PASS" if result else "❌ FAIL"
-        print(f"   {test_name}: {status}")
+        results_log.append(f"   {test_name}: {status}")
         if not result:
             all_passed = False
     
-    print("\n" + "=" * 50)
+    results_log.append("\n" + "=" * 50)
     if all_passed:
-        print("🎉 All tests passed! System is working correctly.")
-        print("\n💡 You can now:")
-        print("   1. Open http://localhost:5173 in your browser")
-        print("   2. Use connection string: sqlite:///test_database.db")
-        print("   3. Try queries like 'Show me total sales by category'")
+        results_log.append("🎉 All tests passed! System is working correctly.")
+        results_log.append("\n💡 You can now:")
+        results_log.append("   1. Open http://localhost:5173 in your browser")
+        results_log.append("   2. Use connection string: sqlite:///test_database.db")
+        results_log.append("   3. Try queries like 'Show me total sales by category'")
     else:
-        print("⚠️  Some tests failed. Check the logs above for details.")
+        results_log.append("⚠️  Some tests failed. Check the logs above for details.")
     
+    sys.stdout.write("\n".join(results_log) + "\n")
     return all_passed
 
 if __name__ == "__main__":